@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    Two-tier cache of token to user snapshots.
+
+    Snapshots are kept in a small in-process LRU with a short TTL in
+    front of a shared Django cache backend. Entries are removed from
+    the shared cache and the local tier of the current process when
+    the token or its user changes, the local tiers of other processes
+    expire on their own.
+    """
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[settings.TOKEN_CACHE_ALIAS]
+
+    def make_key(self, key):
+        return f'auth_token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def get(self, key):
+        """Method returns the cached user and token or None."""
+
+        cache_key = self.make_key(key)
+        with self._lock:
+            entry = self._local.get(cache_key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._local.move_to_end(cache_key)
+                    return value
+                del self._local[cache_key]
+        value = self.backend.get(cache_key)
+        if value is not None:
+            self._set_local(cache_key, value)
+        return value
+
+    def set(self, key, value):
+        cache_key = self.make_key(key)
+        self.backend.set(
+            cache_key,
+            value,
+            timeout=settings.TOKEN_CACHE_TIMEOUT,
+        )
+        self._set_local(cache_key, value)
+
+    def delete(self, keys):
+        """Method removes the snapshots of the given tokens."""
+
+        cache_keys = [self.make_key(key) for key in keys]
+        if not cache_keys:
+            return
+        self.backend.delete_many(cache_keys)
+        with self._lock:
+            for cache_key in cache_keys:
+                self._local.pop(cache_key, None)
+
+    def _set_local(self, cache_key, value):
+        expires = time.monotonic() + settings.TOKEN_CACHE_LOCAL_TIMEOUT
+        with self._lock:
+            self._local[cache_key] = (expires, value)
+            self._local.move_to_end(cache_key)
+            while len(self._local) > settings.TOKEN_CACHE_LOCAL_SIZE:
+                self._local.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches the token with its user,
+    so authenticated requests do not join Token to User each time.
+    Only valid tokens of active users are cached.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            entry = super().authenticate_credentials(key)
+            token_cache.set(key, entry)
+        return entry
@@ -0,0 +1,60 @@
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+current_routing = ContextVar('current_routing', default=None)
+
+
+class RequestRouting:
+    """Database the reads of one request go to."""
+
+    def __init__(self):
+        self.database = DEFAULT_DB_ALIAS
+
+    def use_replica(self):
+        """Method picks a replica for the rest of the request."""
+
+        if settings.DATABASE_REPLICAS:
+            self.database = random.choice(settings.DATABASE_REPLICAS)
+
+
+def get_pin_cache():
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+
+def get_pin_key(request):
+    """
+    Function returns the cache key pinning the client to the primary.
+    Clients are told apart by their Authorization header, which is
+    known before the view authenticates the request.
+    """
+
+    authorization = request.headers.get('Authorization')
+    if not authorization:
+        return None
+    digest = hashlib.sha256(authorization.encode()).hexdigest()
+    return f'db_pin:{digest}'
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of a request to the database
+    chosen by ReplicaRoutingMiddleware and everything else, including
+    token lookups, to the primary database.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if routing is None or model._meta.app_label == 'authtoken':
+            return DEFAULT_DB_ALIAS
+        return routing.database
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -1,8 +1,22 @@
-from app.models import Recipe, Tag
+from app.models import Recipe, Tag, TagForRecipe
+from app.search import search_recipes
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import (
+    Case,
+    Exists,
+    IntegerField,
+    OuterRef,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Lower, StrIndex
 
 import django_filters
 
-from rest_framework.filters import SearchFilter
+from rest_framework.filters import BaseFilterBackend, SearchFilter
 
 
 class IngredientSearchFilter(SearchFilter):
@@ -11,10 +25,44 @@ class IngredientSearchFilter(SearchFilter):
     search_param = "name"
 
 
+class IngredientAutocompleteFilter(BaseFilterBackend):
+    """
+    Ingredient autocomplete filter by name.
+    Prefix matches go first, then substring matches and, on PostgreSQL,
+    fuzzy matches found through the trigram index ranked by similarity.
+    """
+
+    search_param = 'name'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        queryset = queryset.annotate(
+            is_prefix=Case(
+                When(name__istartswith=query, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+        )
+        if connection.vendor == 'postgresql':
+            return queryset.annotate(
+                similarity=TrigramWordSimilarity(query, 'name'),
+            ).filter(
+                Q(name__icontains=query) | Q(name__trigram_word_similar=query),
+            ).order_by('is_prefix', '-similarity', 'name')
+        return queryset.annotate(
+            position=StrIndex(Lower('name'), Value(query.lower())),
+        ).filter(
+            name__icontains=query,
+        ).order_by('is_prefix', 'position', 'name')
+
+
 class RecipeFilter(django_filters.FilterSet):
     """
     Recipe filter allows you to filter by
-    favorites, shopping cart, tag and author.
+    favorites, shopping cart, tag and author
+    and to search the name, text and ingredients.
     """
 
     is_favorited = django_filters.filters.NumberFilter(
@@ -25,7 +73,9 @@ class RecipeFilter(django_filters.FilterSet):
         queryset=Tag.objects.all(),
         field_name='tags__slug',
         to_field_name='slug',
+        method='tags_filter',
     )
+    search = django_filters.filters.CharFilter(method='search_filter')
 
     def favorite_filter(self, queryset, name, value):
         if value == 1:
@@ -39,6 +89,36 @@ class RecipeFilter(django_filters.FilterSet):
             return queryset.filter(shopping_carts__user=user.id)
         return queryset
 
+    def tags_filter(self, queryset, name, value):
+        """
+        Method keeps the recipes having any of the tags. It uses EXISTS
+        instead of a join, so no DISTINCT is needed to drop duplicates.
+        """
+
+        if not value:
+            return queryset
+        return queryset.filter(
+            Exists(
+                TagForRecipe.objects.filter(
+                    recipe=OuterRef('pk'),
+                    tag__in=value,
+                ),
+            ),
+        )
+
+    def search_filter(self, queryset, name, value):
+        """Method keeps the recipes matching the query, best first."""
+
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
+
     class Meta:
         model = Recipe
-        fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
+        fields = (
+            'is_favorited',
+            'is_in_shopping_cart',
+            'author',
+            'tags',
+            'search',
+        )
@@ -0,0 +1,358 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from api.database import (
+    RequestRouting,
+    current_routing,
+    get_pin_cache,
+    get_pin_key,
+)
+
+from app.metrics import (
+    REQUESTS_IN_PROGRESS,
+    REQUEST_LATENCY,
+    REQUEST_QUERIES,
+)
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger('api.metrics')
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings and queries collected while handling one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.timings = Counter()
+        self.depth = 0
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def add_timing(self, name, started):
+        self.timings[name] += time.perf_counter() - started
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def get_duplicates(self, threshold):
+        """
+        Method returns the statements executed at least threshold times,
+        the same sql with different parameters usually means an N+1.
+        """
+
+        counts = Counter(sql for sql, _ in self.queries)
+        return {
+            sql: count for sql, count in counts.items() if count >= threshold
+        }
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper recording the statement in the metrics
+    of the current request. The metrics are looked up in a context
+    variable, so queries run by async views in worker threads are
+    recorded as well.
+    """
+
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.execute(execute, sql, params, many, context)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """Function installs record_query on a database connection."""
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def instrument_serializers():
+    """
+    Function wraps BaseSerializer.data to time the serialization,
+    nested serializers are counted as part of the outermost one.
+    The wrapper applies to every serializer in the process, so it is
+    only installed when REQUEST_METRICS_SERIALIZER_TIMING is on.
+    """
+
+    data = BaseSerializer.data
+    if getattr(data.fget, 'instrumented', False):
+        return
+
+    def timed_data(serializer):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return data.fget(serializer)
+        started = time.perf_counter()
+        metrics.depth += 1
+        try:
+            return data.fget(serializer)
+        finally:
+            metrics.depth -= 1
+            if not metrics.depth:
+                metrics.add_timing('serializer', started)
+
+    timed_data.instrumented = True
+    BaseSerializer.data = property(timed_data)
+
+
+def get_view_name(request):
+    """
+    Function returns the name of the view handling the request,
+    for viewsets it is the class with the action, e.g. RecipeViewSet.list.
+    """
+
+    match = request.resolver_match
+    if match is None:
+        return None
+    view = match.func
+    cls = getattr(view, 'cls', None)
+    if cls is None:
+        return f'{view.__module__}.{view.__qualname__}'
+    method = request.method.lower()
+    action = (getattr(view, 'actions', None) or {}).get(method, method)
+    return f'{cls.__name__}.{action}'
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware measuring the number of queries, database and view time
+    of each request, and the serializer time when
+    REQUEST_METRICS_SERIALIZER_TIMING is on. The timings are returned in
+    the Server-Timing header and logged as json lines. Slow requests are
+    sampled with their sql and repeated statements are reported as
+    N+1 candidates of the view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.slow_ms = settings.REQUEST_METRICS_SLOW_MS
+        self.sample_rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        self.duplicate_threshold = (
+            settings.REQUEST_METRICS_DUPLICATE_THRESHOLD
+        )
+        self.server_timing = settings.REQUEST_METRICS_SERVER_TIMING
+        self.n_plus_one = {}
+        self.lock = threading.Lock()
+        if settings.REQUEST_METRICS_SERIALIZER_TIMING:
+            instrument_serializers()
+        connection_created.connect(instrument_connection)
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(None, connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+            REQUESTS_IN_PROGRESS.dec()
+        return self.process_metrics(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+            REQUESTS_IN_PROGRESS.dec()
+        return self.process_metrics(request, response, metrics)
+
+    def process_metrics(self, request, response, metrics):
+        self.finish_view(metrics)
+        total = time.perf_counter() - metrics.started
+        if self.server_timing:
+            response['Server-Timing'] = self.format_server_timing(
+                metrics, total,
+            )
+        self.report(request, response, metrics, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        self.finish_view(current_metrics.get())
+        return response
+
+    def finish_view(self, metrics):
+        """
+        Method records the view time once, on the template response
+        hook for DRF responses, or after the response otherwise.
+        """
+
+        if metrics is not None and hasattr(metrics, 'view_started'):
+            metrics.add_timing('view', metrics.view_started)
+            del metrics.view_started
+
+    def format_server_timing(self, metrics, total):
+        entries = [
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{len(metrics.queries)} queries"',
+        ]
+        entries.extend(
+            f'{name};dur={duration * 1000:.1f}'
+            for name, duration in metrics.timings.items()
+        )
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+    def report(self, request, response, metrics, total):
+        view = get_view_name(request)
+        REQUEST_LATENCY.labels(
+            view or 'unmatched',
+            request.method,
+            f'{response.status_code // 100}xx',
+        ).observe(total)
+        REQUEST_QUERIES.labels(view or 'unmatched').observe(
+            len(metrics.queries),
+        )
+        record = {
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'queries': len(metrics.queries),
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        record.update(
+            (f'{name}_ms', round(duration * 1000, 2))
+            for name, duration in metrics.timings.items()
+        )
+        duplicates = metrics.get_duplicates(self.duplicate_threshold)
+        if duplicates:
+            record['duplicates'] = sum(duplicates.values())
+            self.report_n_plus_one(view, duplicates)
+        logger.info(json.dumps(record))
+        if (
+            total * 1000 >= self.slow_ms
+            and random.random() < self.sample_rate
+        ):
+            record['event'] = 'slow_request'
+            record['sql'] = [
+                {'sql': sql, 'ms': round(duration * 1000, 2)}
+                for sql, duration in metrics.queries
+            ]
+            logger.warning(json.dumps(record))
+
+    def report_n_plus_one(self, view, duplicates):
+        """
+        Method logs the repeated statements of the view, each statement
+        is logged again only when it is repeated more than before.
+        """
+
+        with self.lock:
+            seen = self.n_plus_one.setdefault(view, {})
+            new = {
+                sql: count for sql, count in duplicates.items()
+                if count > seen.get(sql, 0)
+            }
+            seen.update(new)
+        for sql, count in new.items():
+            logger.warning(json.dumps({
+                'event': 'n_plus_one',
+                'view': view,
+                'count': count,
+                'sql': sql,
+            }))
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Middleware deciding which database the reads of the request go to.
+    Safe requests to viewsets with read_from_replica set are read from
+    a replica, see api.database.ReplicaRouter. After a successful write
+    the client is pinned to the primary for REPLICA_PIN_TIMEOUT seconds,
+    so it reads its own writes while the replicas catch up.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_routing.set(RequestRouting())
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        key = self.get_write_pin_key(request, response)
+        if key is not None:
+            get_pin_cache().set(key, True, settings.REPLICA_PIN_TIMEOUT)
+        return response
+
+    async def __acall__(self, request):
+        token = current_routing.set(RequestRouting())
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        key = self.get_write_pin_key(request, response)
+        if key is not None:
+            await get_pin_cache().aset(
+                key,
+                True,
+                settings.REPLICA_PIN_TIMEOUT,
+            )
+        return response
+
+    def get_write_pin_key(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return None
+        return get_pin_key(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = current_routing.get()
+        cls = getattr(view_func, 'cls', None)
+        if (
+            routing is None
+            or request.method not in SAFE_METHODS
+            or not getattr(cls, 'read_from_replica', False)
+        ):
+            return
+        key = get_pin_key(request)
+        if key is None or not get_pin_cache().get(key):
+            routing.use_replica()
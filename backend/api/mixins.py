@@ -1,4 +1,19 @@
+import hashlib
+import json
+from functools import update_wrapper
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.decorators import classonlymethod
+from django.utils.http import http_date
+
 from rest_framework import mixins, viewsets
+from rest_framework.response import Response
 
 
 class ListRetrieveCreateViewSet(
@@ -8,3 +23,161 @@ class ListRetrieveCreateViewSet(
     viewsets.GenericViewSet,
 ):
     pass
+
+
+class AsyncViewSetMixin:
+    """
+    Mixin for serving viewset actions defined as coroutines
+    asynchronously. A route with at least one async action is
+    exposed as an async Django view, its remaining sync actions
+    run in a worker thread together with authentication.
+    """
+
+    @classmethod
+    def is_async_route(cls, actions):
+        return any(
+            iscoroutinefunction(getattr(cls, action, None))
+            for action in actions.values()
+        )
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not cls.is_async_route(view.actions):
+            return view
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        return update_wrapper(async_view, view)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_async_route(self.action_map):
+            return super().dispatch(request, *args, **kwargs)
+        return self.async_dispatch(request, *args, **kwargs)
+
+    async def async_dispatch(self, request, *args, **kwargs):
+        """Method mirrors APIView.dispatch for async routes."""
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            handler = self.get_handler(request)
+            if iscoroutinefunction(handler):
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(self.handle_sync)(
+                    handler, request, *args, **kwargs,
+                )
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs,
+        )
+        return self.response
+
+    def get_handler(self, request):
+        method = request.method.lower()
+        if method not in self.http_method_names:
+            return self.http_method_not_allowed
+        return getattr(self, method, self.http_method_not_allowed)
+
+    def handle_sync(self, handler, request, *args, **kwargs):
+        self.initial(request, *args, **kwargs)
+        return handler(request, *args, **kwargs)
+
+
+class CachedReferenceDataMixin(AsyncViewSetMixin):
+    """
+    Mixin for read-only viewsets over rarely changing reference data.
+    Serialized responses are kept in a versioned cache, conditional
+    requests are answered with 304 Not Modified. Cache hits are served
+    without leaving the event loop.
+    """
+
+    cache = None
+
+    async def cached_response(self, request, view_method, *args, **kwargs):
+        """
+        Method returns the cached data of the view method
+        together with ETag and Last-Modified headers.
+        """
+
+        version = await self.cache.aget_version()
+        key = request.get_full_path()
+        entry = await self.cache.aget(key, version)
+        if entry is None:
+            response = await sync_to_async(view_method)(
+                request, *args, **kwargs,
+            )
+            data = response.data
+            content = json.dumps(data, sort_keys=True, default=str).encode()
+            etag = '"{}"'.format(
+                hashlib.md5(content, usedforsecurity=False).hexdigest(),
+            )
+            entry = (etag, data)
+            await self.cache.aset(key, entry, version)
+        etag, data = entry
+        response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version)
+        patch_cache_control(response, no_cache=True)
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(version),
+            response=response,
+        )
+
+    async def list(self, request, *args, **kwargs):
+        return await self.cached_response(
+            request, super().list, *args, **kwargs,
+        )
+
+    async def retrieve(self, request, *args, **kwargs):
+        return await self.cached_response(
+            request, super().retrieve, *args, **kwargs,
+        )
+
+
+def make_etag(*parts):
+    """Function builds a strong ETag from the given parts."""
+
+    content = repr(parts).encode()
+    return '"{}"'.format(
+        hashlib.md5(content, usedforsecurity=False).hexdigest(),
+    )
+
+
+class ConditionalGetMixin(AsyncViewSetMixin):
+    """
+    Mixin for answering conditional requests with 304 Not Modified
+    before the view does any serialization work.
+    """
+
+    async def conditional_response(self, request, etag, last_modified,
+                                   view_method, *args, **kwargs):
+        """
+        Method calls the view method in a worker thread
+        only when the client copy of the response is stale.
+        """
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        if response is None:
+            response = await sync_to_async(view_method)(
+                request, *args, **kwargs,
+            )
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
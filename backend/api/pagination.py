@@ -1,4 +1,15 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class LimitPageNumberPagination(PageNumberPagination):
@@ -8,3 +19,131 @@ class LimitPageNumberPagination(PageNumberPagination):
     """
 
     page_size_query_param = 'limit'
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over the fields listed in the keyset_ordering
+    attribute of the view. Every page continues right after the last
+    row of the previous one, so deep pages are as cheap as the first.
+    The count of objects can be suppressed with count=0.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    count_query_param = 'count'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = getattr(view, 'keyset_ordering', ('id',))
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        if request.query_params.get(self.count_query_param) != '0':
+            self.count = queryset.count()
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+        results = list(queryset[:self.page_size + 1])
+        self.next_position = None
+        if len(results) > self.page_size:
+            results = results[:self.page_size]
+            self.next_position = [
+                getattr(results[-1], field) for field in self.ordering
+            ]
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_keyset_filter(self, position):
+        """
+        Method builds the condition selecting the rows that follow
+        the given position in the lexicographic keyset order.
+        """
+
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            step = Q(**{f'{field}__gt': position[index]})
+            for previous in range(index):
+                step &= Q(**{self.ordering[previous]: position[previous]})
+            condition |= step
+        return condition
+
+    def decode_cursor(self, request, model):
+        """
+        Method returns the position encoded in the cursor, every value
+        converted by the model field it orders by, or None without
+        a cursor. A cursor that does not decode to such a position
+        is rejected as not found.
+        """
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(b64decode(encoded.encode('ascii')))
+            if not isinstance(position, list) or (
+                len(position) != len(self.ordering)
+            ):
+                raise ValueError('Wrong position length')
+            if None in position:
+                raise ValueError('Null position value')
+            return [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        return b64encode(json.dumps(position).encode()).decode('ascii')
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['results'] = data
+        return Response(response)
+
+
+class OptionalKeysetPagination(LimitPageNumberPagination):
+    """
+    Page number pagination that switches to keyset pagination
+    when the cursor query parameter is present, an empty
+    cursor value requests the first page.
+    """
+
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_pagination_class.cursor_query_param in (
+            request.query_params
+        ):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,117 @@
+import csv
+import json
+
+from rest_framework import renderers
+
+
+class Echo:
+    """An object that implements just the write method of the file-like
+    interface, so that csv.writer returns the formatted row."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingCartRenderer(renderers.BaseRenderer):
+    """
+    Base of the shopping cart renderers, streaming the cart from
+    an iterable of ingredient rows or, under ASGI, from an async one,
+    so that the server does not have to buffer it. Subclasses render
+    a row and optionally the start and the end of the file.
+    """
+
+    charset = 'utf-8'
+
+    def render_start(self):
+        return ''
+
+    def render_row(self, ingredient, first):
+        raise NotImplementedError
+
+    def render_end(self, empty):
+        return ''
+
+    def stream(self, ingredients):
+        """Generator yielding the shopping cart row by row."""
+
+        yield self.render_start()
+        first = True
+        for ingredient in ingredients:
+            yield self.render_row(ingredient, first)
+            first = False
+        yield self.render_end(first)
+
+    async def astream(self, ingredients):
+        """Async generator yielding the shopping cart row by row."""
+
+        yield self.render_start()
+        first = True
+        async for ingredient in ingredients:
+            yield self.render_row(ingredient, first)
+            first = False
+        yield self.render_end(first)
+
+
+class TextShoppingCartRenderer(ShoppingCartRenderer):
+    """Shopping cart renderer to plain text."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return ''.join(
+            f'{key}: {value}\n' for key, value in data.items()
+        ).encode(self.charset)
+
+    def render_row(self, ingredient, first):
+        return (
+            f'{ingredient["name"]} '
+            f'({ingredient["measurement_unit"]}) - '
+            f'{ingredient["amount"]}\n'
+        )
+
+
+class CSVShoppingCartRenderer(ShoppingCartRenderer):
+    """Shopping cart renderer to csv."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+    header = ('name', 'measurement_unit', 'amount')
+    writer = csv.writer(Echo())
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        writer = csv.writer(Echo())
+        return ''.join(
+            writer.writerow(row) for row in data.items()
+        ).encode(self.charset)
+
+    def render_start(self):
+        return self.writer.writerow(self.header)
+
+    def render_row(self, ingredient, first):
+        return self.writer.writerow(
+            [ingredient[field] for field in self.header],
+        )
+
+
+class JSONShoppingCartRenderer(ShoppingCartRenderer):
+    """Shopping cart renderer to json."""
+
+    media_type = 'application/json'
+    format = 'json'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+    def render_row(self, ingredient, first):
+        separator = '[' if first else ','
+        return separator + json.dumps(ingredient, ensure_ascii=False)
+
+    def render_end(self, empty):
+        return '[]' if empty else ']'
@@ -1,3 +1,4 @@
+from app.images import get_variant_urls
 from app.models import (
     Favourite,
     Follow,
@@ -10,32 +11,102 @@ from app.models import (
 )
 
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 
 from drf_extra_fields.fields import Base64ImageField
 
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 User = get_user_model()
 
 
-class IngredientKeyedRelatedField(serializers.PrimaryKeyRelatedField):
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """
+    A field that resolves all submitted primary keys with a single query
+    and reports duplicate and missing objects in one pass.
+    """
+
+    default_error_messages = {
+        'duplicate': 'Duplicate pk "{pk_value}" - object is listed twice.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        pks = [child.to_pk(item) for item in data]
+        seen = set()
+        for pk in pks:
+            if pk in seen:
+                self.fail('duplicate', pk_value=pk)
+            seen.add(pk)
+        objects = child.get_queryset().in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=pk)
+        return [
+            child.to_value(objects[pk], item) for pk, item in zip(pks, data)
+        ]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    A primary key field that, when used with many=True,
+    loads all related objects with a single query.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_pk(self, data):
+        """Method for extracting the primary key from the submitted item."""
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def to_value(self, obj, data):
+        """Method for building the validated value of the submitted item."""
+
+        return obj
+
+
+class IngredientKeyedRelatedField(BulkPrimaryKeyRelatedField):
     """
     A field that processes the ingredient id and its quantity in the recipe.
+    It is used with many=True, all ingredients are loaded in one query.
     """
 
+    amount_field = serializers.IntegerField(min_value=1, max_value=32767)
+
     def get_queryset(self):
         return Ingredient.objects.all()
 
-    def to_internal_value(self, data):
+    def to_pk(self, data):
         try:
-            ingredient = self.get_queryset().get(id=data['id'])
-            amount = data['amount']
-            return (ingredient, amount)
-        except ObjectDoesNotExist:
-            self.fail('does_not_exist', pk_value=data['id'])
-        except (TypeError, ValueError):
-            self.fail('incorrect_type', data_type=type(data['id']).__name__)
+            return super().to_pk(data['id'])
+        except (KeyError, TypeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def to_value(self, obj, data):
+        try:
+            amount = self.amount_field.run_validation(
+                data.get('amount', serializers.empty),
+            )
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError({'amount': error.detail})
+        return (obj, amount)
 
     def to_representation(self, value):
         ingredient, amount = value
@@ -80,6 +151,8 @@ class UserSerializer(serializers.ModelSerializer):
         is subscribed to another user.
         """
 
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         user = request.user
         return Follow.objects.filter(user=user.id, following=obj).exists()
@@ -134,6 +207,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -146,15 +220,26 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time',
         )
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'is_subscribed'):
+            instance.author.is_subscribed = instance.is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
         """
         Method indicating whether the recipe has been added to favorites.
         """
 
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        recipe_state = self.context.get('recipe_state')
+        if recipe_state is not None:
+            return recipe_state.is_favorited(obj.pk)
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
@@ -168,6 +253,11 @@ class RecipeSerializer(serializers.ModelSerializer):
         Method indicating whether the recipe has been added to shopping cart.
         """
 
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        recipe_state = self.context.get('recipe_state')
+        if recipe_state is not None:
+            return recipe_state.is_in_shopping_cart(obj.pk)
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
@@ -177,18 +267,37 @@ class RecipeSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_image(self, obj):
-        """Method for image representation."""
+        """
+        Method for image representation, the size of the image
+        is selected by the image_variant key of the context.
+        """
+
+        variant = self.context.get('image_variant', 'full')
+        return get_variant_urls(obj)[variant]['image']
+
+    def get_images(self, obj):
+        """Method for representing all sizes and formats of the image."""
 
-        image_path = obj.image.path
-        new_path = image_path.replace('/app', '')
-        return new_path
+        return get_variant_urls(obj)
+
+
+class CookableRecipeSerializer(RecipeSerializer):
+    """
+    Serializer to represent the recipe found by the available
+    ingredients, with the number of ingredients that are missing.
+    """
+
+    missing_ingredients = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('missing_ingredients',)
 
 
 class CreateRecipeSerializer(serializers.ModelSerializer):
     """Serializer for recipe creation."""
 
     ingredients = IngredientKeyedRelatedField(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
     )
@@ -208,20 +317,71 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
     def create_ingredient(self, ingredients, recipe):
         """Ingredient creation method."""
 
-        for obj in ingredients:
-            ingredient, amount = obj
-            IngredientInRecipe.objects.create(
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
                 recipe=recipe,
                 ingredient=ingredient,
                 amount=amount,
-            )
+            ) for ingredient, amount in ingredients
+        )
 
     def create_tag(self, tags, recipe):
         """Tag creation method."""
 
-        for pk in tags:
-            TagForRecipe.objects.create(recipe=recipe, tag=pk)
+        TagForRecipe.objects.bulk_create(
+            TagForRecipe(recipe=recipe, tag=tag) for tag in tags
+        )
+
+    def update_ingredient(self, ingredients, recipe):
+        """
+        Ingredient update method that touches only
+        the rows that have actually changed.
+        """
+
+        existing = {
+            obj.ingredient_id: obj
+            for obj in IngredientInRecipe.objects.filter(recipe=recipe)
+        }
+        amounts = {ingredient.id: amount for ingredient, amount in ingredients}
+        IngredientInRecipe.objects.filter(
+            recipe=recipe,
+            ingredient_id__in=existing.keys() - amounts.keys(),
+        ).delete()
+        changed = []
+        for pk, amount in amounts.items():
+            if pk in existing and existing[pk].amount != amount:
+                existing[pk].amount = amount
+                changed.append(existing[pk])
+        IngredientInRecipe.objects.bulk_update(changed, ('amount',))
+        self.create_ingredient(
+            [
+                (ingredient, amount) for ingredient, amount in ingredients
+                if ingredient.id not in existing
+            ],
+            recipe,
+        )
+
+    def update_tag(self, tags, recipe):
+        """
+        Tag update method that touches only
+        the rows that have actually changed.
+        """
+
+        existing = set(
+            TagForRecipe.objects.filter(
+                recipe=recipe,
+            ).values_list('tag_id', flat=True)
+        )
+        TagForRecipe.objects.filter(
+            recipe=recipe,
+            tag_id__in=existing - {tag.id for tag in tags},
+        ).delete()
+        self.create_tag(
+            [tag for tag in tags if tag.id not in existing],
+            recipe,
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request')
         user = request.user
@@ -232,36 +392,41 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         self.create_tag(tags, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         if 'tags' in validated_data:
-            tags = validated_data.pop('tags')
-            instance.tags.clear()
-            self.create_tag(tags, instance)
+            self.update_tag(validated_data.pop('tags'), instance)
         if 'ingredients' in validated_data:
-            ingredients = validated_data.pop('ingredients')
-            instance.ingredients.clear()
-            self.create_ingredient(ingredients, instance)
+            self.update_ingredient(validated_data.pop('ingredients'), instance)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
-        request = self.context.get('request')
-        serializer = RecipeSerializer(instance, context={'request': request})
+        view = self.context.get('view')
+        if view is not None:
+            instance = view.get_queryset().get(pk=instance.pk)
+        serializer = RecipeSerializer(instance, context=self.context)
         return serializer.data
 
 
 class FavouriteAndShoppingCartSerializer(serializers.ModelSerializer):
     """Serializer for favorite and shopping cart."""
 
+    image = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
+    def get_image(self, obj):
+        """Method for representing the image thumbnail."""
+
+        return get_variant_urls(obj)['thumbnail']['image']
+
 
 class FollowSerializer(serializers.ModelSerializer):
     """Serializer for managing subscriptions."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -281,15 +446,65 @@ class FollowSerializer(serializers.ModelSerializer):
         with the ability to specify an object output limit.
         """
 
-        request = self.context.get('request')
-        recipes_limit = request.GET.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=obj)
-        if recipes_limit:
-            recipes = Recipe.objects.filter(author=obj)[:int(recipes_limit)]
+        if hasattr(obj, 'preview_recipes'):
+            recipes = obj.preview_recipes
+        else:
+            recipes_limit = self.context.get(
+                'recipes_limit',
+                RecipesLimitSerializer.max_recipes_limit,
+            )
+            recipes = Recipe.objects.filter(author=obj)[:recipes_limit]
         serializer = FavouriteAndShoppingCartSerializer(recipes, many=True)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        """Method for counting the number of user recipes."""
 
-        return Recipe.objects.filter(author=obj).count()
+class RecipesLimitSerializer(serializers.Serializer):
+    """
+    Serializer for validating the number of recipes shown for each
+    subscription, values above the maximum are capped.
+    """
+
+    max_recipes_limit = 50
+
+    recipes_limit = serializers.IntegerField(
+        min_value=1,
+        default=max_recipes_limit,
+    )
+
+    def validate_recipes_limit(self, value):
+        return min(value, self.max_recipes_limit)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """
+    Serializer for validating the list of recipe ids
+    added to or removed from favorites or the shopping cart at once.
+    """
+
+    max_recipes = 100
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=max_recipes,
+    )
+
+
+class AvailableIngredientsSerializer(serializers.Serializer):
+    """
+    Serializer for validating the ingredients the user has
+    and the number of missing ingredients they accept.
+    """
+
+    max_ingredients = 100
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=max_ingredients,
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0,
+        allow_null=True,
+        default=None,
+    )
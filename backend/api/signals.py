@@ -0,0 +1,29 @@
+from api.authentication import token_cache
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    """Removes the cached snapshot when a token is deleted on logout."""
+
+    token_cache.delete([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """
+    Removes the cached snapshots of the user tokens when the user
+    is saved, e.g. after a password change or deactivation.
+    """
+
+    if not created:
+        token_cache.delete(
+            Token.objects.filter(user=instance).values_list('key', flat=True)
+        )
@@ -0,0 +1,58 @@
+from unittest import skipIf
+
+from app.models import Ingredient
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+
+URL = '/api/ingredients/autocomplete/'
+
+
+@skipIf(
+    connection.vendor == 'postgresql',
+    'PostgreSQL ranks the substring matches by trigram similarity',
+)
+class IngredientAutocompleteTest(TestCase):
+    """Prefix matches go first, then substring matches by position."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in (
+            'coconut milk',
+            'salt',
+            'milkshake',
+            'soy milk',
+            'Milk',
+            'buttermilk',
+        ):
+            Ingredient.objects.create(name=name, measurement_unit='g')
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def get_names(self, params):
+        response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_ordering(self):
+        for query in ('milk', 'MILK', ' milk '):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.get_names({'name': query}),
+                    ['Milk', 'milkshake', 'soy milk', 'buttermilk',
+                     'coconut milk'],
+                )
+
+    def test_limit(self):
+        for limit, count in (('2', 2), ('0', 1), ('abc', 5), ('100', 5)):
+            with self.subTest(limit=limit):
+                self.assertEqual(
+                    len(self.get_names({'name': 'milk', 'limit': limit})),
+                    count,
+                )
+
+    def test_no_match(self):
+        self.assertEqual(self.get_names({'name': 'pepper'}), [])
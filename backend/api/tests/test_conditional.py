@@ -0,0 +1,98 @@
+from app.models import Follow, Recipe
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
+class RecipeConditionalGetTest(TestCase):
+    """The recipe ETags change with everything shown in the response."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = (
+            User.objects.create_user(
+                email=f'{name}@example.com',
+                username=name,
+                first_name=name,
+                last_name=name,
+                password='password',
+            )
+            for name in ('user', 'author')
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name='recipe',
+            text='text',
+            image='recipes/images/recipe.png',
+            cooking_time=10,
+        )
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, etag=None):
+        headers = {} if etag is None else {'If-None-Match': etag}
+        return self.client.get(url, headers=headers)
+
+    def assertRevalidated(self, url, change, status_code=200):
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertEqual(self.get(url, etag).status_code, status_code)
+
+    def test_unchanged(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/'):
+            with self.subTest(url=url):
+                self.assertRevalidated(url, lambda: None, 304)
+
+    def test_author_renamed(self):
+        def rename():
+            self.author.first_name = 'renamed'
+            self.author.save()
+
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/'):
+            with self.subTest(url=url):
+                self.assertRevalidated(url, rename)
+
+    def test_author_login_keeps_etag(self):
+        def login():
+            self.author.save(update_fields=['last_login'])
+
+        self.assertRevalidated('/api/recipes/', login, 304)
+
+    def test_subscribed(self):
+        def subscribe():
+            response = self.client.post(
+                f'/api/users/{self.author.pk}/subscribe/',
+            )
+            self.assertEqual(response.status_code, 201)
+
+        self.assertRevalidated('/api/recipes/', subscribe)
+
+    def test_subscription_recreated(self):
+        Follow.objects.create(user=self.user, following=self.author)
+
+        def resubscribe():
+            self.client.delete(f'/api/users/{self.author.pk}/subscribe/')
+            self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+
+        self.assertRevalidated('/api/recipes/', resubscribe)
+
+    def test_favorited(self):
+        def favorite():
+            response = self.client.post(
+                f'/api/recipes/{self.recipe.pk}/favorite/',
+            )
+            self.assertEqual(response.status_code, 201)
+
+        self.assertRevalidated('/api/recipes/', favorite)
@@ -0,0 +1,99 @@
+from app.models import Ingredient, IngredientInRecipe, Recipe
+from app.search import update_ingredient_ids
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+User = get_user_model()
+
+URL = '/api/recipes/cookable/'
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
+class CookableRecipesTest(TestCase):
+    """Recipes are ranked by the ingredients missing from the given ones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='author',
+            last_name='author',
+            password='password',
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='g')
+            for name in ('egg', 'flour', 'milk', 'sugar')
+        ]
+        egg, flour, milk, sugar = cls.ingredients
+        for name, cooking_time, ingredients in (
+            ('pancakes', 20, (egg, flour)),
+            ('omelette', 5, (egg,)),
+            ('custard', 1, (egg, milk)),
+            ('cake', 1, (flour, milk, sugar)),
+            ('milkshake', 1, (milk, sugar)),
+        ):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=name,
+                text='text',
+                image='recipes/images/recipe.png',
+                cooking_time=cooking_time,
+            )
+            for ingredient in ingredients:
+                IngredientInRecipe.objects.create(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=1,
+                )
+        update_ingredient_ids(apps)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def get(self, params):
+        egg, flour, _, _ = self.ingredients
+        return self.client.get(URL, {
+            'ingredients': [egg.pk, flour.pk],
+            **params,
+        })
+
+    def test_ranking(self):
+        for params, expected in (
+            ({}, [
+                ('omelette', 0),
+                ('pancakes', 0),
+                ('custard', 1),
+                ('cake', 2),
+            ]),
+            ({'max_missing': 1}, [
+                ('omelette', 0),
+                ('pancakes', 0),
+                ('custard', 1),
+            ]),
+            ({'max_missing': 0}, [('omelette', 0), ('pancakes', 0)]),
+        ):
+            with self.subTest(params=params):
+                response = self.get(params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    [
+                        (recipe['name'], recipe['missing_ingredients'])
+                        for recipe in response.json()['results']
+                    ],
+                    expected,
+                )
+
+    def test_invalid_parameters(self):
+        for params in (
+            {'ingredients': []},
+            {'ingredients': ['abc']},
+            {'max_missing': -1},
+            {'cursor': ''},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.get(params).status_code, 400)
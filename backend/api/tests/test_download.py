@@ -0,0 +1,117 @@
+from app.management.commands.benchmark_api import (
+    legacy_download_shopping_cart,
+)
+from app.models import Ingredient, IngredientInRecipe, Recipe, ShoppingCart
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import AsyncClient, TestCase, override_settings
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
+class DownloadShoppingCartTest(TestCase):
+    """The shopping cart is streamed in the requested format."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com',
+            username='user',
+            first_name='user',
+            last_name='user',
+            password='password',
+        )
+        salt, flour = (
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (('salt', 'g'), ('flour', 'kg'))
+        )
+        for name, amounts in (('bread', (5, 2)), ('pie', (3, 1))):
+            recipe = Recipe.objects.create(
+                author=cls.user,
+                name=name,
+                text='text',
+                image='recipes/images/recipe.png',
+                cooking_time=10,
+            )
+            for ingredient, amount in zip((salt, flour), amounts):
+                IngredientInRecipe.objects.create(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=amount,
+                )
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, **kwargs):
+        response = self.client.get(URL, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_formats(self):
+        for params, headers, content_type, extension, content in (
+            (
+                {}, {}, 'text/plain', 'txt',
+                'flour (kg) - 3\nsalt (g) - 8\n',
+            ),
+            (
+                {'format': 'csv'}, {}, 'text/csv', 'csv',
+                'name,measurement_unit,amount\r\n'
+                'flour,kg,3\r\nsalt,g,8\r\n',
+            ),
+            (
+                {}, {'Accept': 'application/json'}, 'application/json', 'json',
+                '[{"name": "flour", "measurement_unit": "kg", "amount": 3},'
+                '{"name": "salt", "measurement_unit": "g", "amount": 8}]',
+            ),
+        ):
+            with self.subTest(content_type=content_type):
+                response, body = self.download(data=params, headers=headers)
+                self.assertEqual(
+                    response['Content-Type'],
+                    f'{content_type}; charset=utf-8',
+                )
+                self.assertEqual(
+                    response['Content-Disposition'],
+                    f'attachment; filename="shopping-list.{extension}"',
+                )
+                self.assertEqual(body, content)
+
+    def test_same_content_as_legacy_download(self):
+        legacy = legacy_download_shopping_cart(self.user).content.decode()
+        _, body = self.download(data={'format': 'txt'})
+        self.assertEqual(
+            sorted(body.splitlines()),
+            sorted(legacy.splitlines()),
+        )
+
+    def test_empty_cart(self):
+        ShoppingCart.objects.all().delete()
+        self.assertEqual(self.client.get(URL).status_code, 404)
+
+    async def test_streamed_under_asgi(self):
+        response = await AsyncClient().get(
+            URL,
+            {'format': 'csv'},
+            headers={'Authorization': f'Token {self.token.key}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        body = b''.join([
+            chunk async for chunk in response.streaming_content
+        ]).decode()
+        self.assertEqual(
+            body,
+            'name,measurement_unit,amount\r\nflour,kg,3\r\nsalt,g,8\r\n',
+        )
@@ -0,0 +1,25 @@
+from django.test import SimpleTestCase, override_settings
+
+
+class MetricsViewTest(SimpleTestCase):
+    """The metrics are only exposed to a scraper with the token."""
+
+    url = '/api/metrics/'
+
+    @override_settings(METRICS_TOKEN='')
+    def test_closed_without_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        for authorization, status_code in (
+            (None, 403),
+            ('Bearer wrong', 403),
+            ('Bearer secret', 200),
+        ):
+            with self.subTest(authorization=authorization):
+                headers = {}
+                if authorization is not None:
+                    headers['Authorization'] = authorization
+                response = self.client.get(self.url, headers=headers)
+                self.assertEqual(response.status_code, status_code)
@@ -0,0 +1,52 @@
+import json
+from base64 import b64encode
+
+from api.pagination import KeysetPagination
+
+from app.models import Recipe
+
+from django.test import SimpleTestCase, TestCase
+
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+
+class KeysetCursorTest(SimpleTestCase):
+    """Cursors are converted by the ordering fields or rejected."""
+
+    def decode(self, position):
+        cursor = b64encode(json.dumps(position).encode()).decode('ascii')
+        request = Request(APIRequestFactory().get('/', {'cursor': cursor}))
+        pagination = KeysetPagination()
+        pagination.ordering = ('name', 'id')
+        return pagination.decode_cursor(request, Recipe)
+
+    def test_position_is_converted(self):
+        self.assertEqual(self.decode(['soup', '7']), ['soup', 7])
+
+    def test_malformed_cursors_are_not_found(self):
+        for position in (
+            ['soup', 'abc'],
+            ['soup', None],
+            ['soup', [1]],
+            ['soup'],
+            {'name': 'soup'},
+        ):
+            with self.subTest(position=position):
+                with self.assertRaises(NotFound):
+                    self.decode(position)
+
+
+class RankedListCursorTest(TestCase):
+    """Lists ordered by rank reject a keyset cursor."""
+
+    def test_search_with_cursor(self):
+        for params, status_code in (
+            ({'search': 'soup', 'cursor': ''}, 400),
+            ({'search': ' ', 'cursor': ''}, 200),
+            ({'cursor': ''}, 200),
+        ):
+            with self.subTest(params=params):
+                response = self.client.get('/api/recipes/', params)
+                self.assertEqual(response.status_code, status_code)
@@ -0,0 +1,69 @@
+from unittest import skipUnless
+
+from api.filters import RecipeFilter
+
+from app.models import Recipe, Tag, TagForRecipe
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+User = get_user_model()
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'the plans are checked on PostgreSQL only',
+)
+class RecipePlanTest(TestCase):
+    """The recipe list queries use the indexes added for them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='author',
+            last_name='author',
+            password='password',
+        )
+        tags = [
+            Tag.objects.create(name=f'tag{i}', color='#FFFFFF', slug=f'tag{i}')
+            for i in range(3)
+        ]
+        for i in range(30):
+            recipe = Recipe.objects.create(
+                author=cls.author,
+                name=f'recipe{i}',
+                text='text',
+                image='recipes/images/recipe.png',
+                cooking_time=i + 1,
+            )
+            TagForRecipe.objects.create(recipe=recipe, tag=tags[i % 3])
+
+    def explain(self, queryset):
+        """
+        Method returns the plan of the query with sequential scans
+        disabled, which the few test rows would favor otherwise.
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('ANALYZE')
+        return queryset.explain()
+
+    def test_tags_filter_is_a_semi_join(self):
+        queryset = RecipeFilter(
+            data={'tags': ['tag0', 'tag1']},
+            queryset=Recipe.objects.all(),
+        ).qs.order_by('name', 'id')[:6]
+        plan = self.explain(queryset)
+        self.assertIn('Semi Join', plan)
+        self.assertNotIn('SubPlan', plan)
+        self.assertNotIn('Unique', plan)
+
+    def test_author_page_uses_author_name_id_index(self):
+        queryset = Recipe.objects.filter(
+            author=self.author,
+        ).order_by('name', 'id')[:6]
+        self.assertIn('recipe_author_name_id_idx', self.explain(queryset))
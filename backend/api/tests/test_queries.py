@@ -0,0 +1,108 @@
+from unittest import mock
+
+from api.views import RecipeViewSet
+
+from app.models import (
+    Favourite,
+    Follow,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+    TagForRecipe,
+)
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
+class RecipeQueriesTest(TestCase):
+    """The recipe endpoints run a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = (
+            User.objects.create_user(
+                email=f'{name}@example.com',
+                username=name,
+                first_name=name,
+                last_name=name,
+                password='password',
+            )
+            for name in ('user', 'author')
+        )
+        tags = [
+            Tag.objects.create(name=f'tag{i}', color='#FFFFFF', slug=f'tag{i}')
+            for i in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'ingredient{i}',
+                                      measurement_unit='g')
+            for i in range(5)
+        ]
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                author=cls.author if i % 2 else cls.user,
+                name=f'recipe{i}',
+                text='text',
+                image='recipes/images/recipe.png',
+                cooking_time=i + 1,
+            )
+            for tag in tags:
+                TagForRecipe.objects.create(recipe=recipe, tag=tag)
+            for ingredient in ingredients[i % 3:i % 3 + 3]:
+                IngredientInRecipe.objects.create(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=10,
+                )
+            if i % 3 == 0:
+                Favourite.objects.create(user=cls.user, recipe=recipe)
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Follow.objects.create(user=cls.user, following=cls.author)
+        cls.recipe = Recipe.objects.order_by('id').first()
+
+    def get(self, url, user=None):
+        for cache in caches.all():
+            cache.clear()
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_anonymous_list(self):
+        for limit in (2, 10):
+            with self.subTest(limit=limit), self.assertNumQueries(5):
+                self.get(f'/api/recipes/?limit={limit}')
+
+    def test_authenticated_list(self):
+        for limit in (2, 10):
+            with self.subTest(limit=limit), self.assertNumQueries(6):
+                self.get(f'/api/recipes/?limit={limit}', self.user)
+
+    def test_anonymous_retrieve(self):
+        with self.assertNumQueries(4):
+            self.get(f'/api/recipes/{self.recipe.pk}/')
+
+    def test_authenticated_retrieve(self):
+        with self.assertNumQueries(5):
+            self.get(f'/api/recipes/{self.recipe.pk}/', self.user)
+
+    def test_list_filters_once(self):
+        with mock.patch.object(
+            RecipeViewSet,
+            'filter_queryset',
+            autospec=True,
+            side_effect=RecipeViewSet.filter_queryset,
+        ) as filter_queryset:
+            self.get('/api/recipes/?tags=tag0', self.user)
+        self.assertEqual(filter_queryset.call_count, 1)
@@ -0,0 +1,100 @@
+from app.models import Favourite, Recipe, ShoppingCart
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
+class RecipeStateFlagsTest(TestCase):
+    """The favorite and cart flags follow the changes of the user."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = (
+            User.objects.create_user(
+                email=f'{name}@example.com',
+                username=name,
+                first_name=name,
+                last_name=name,
+                password='password',
+            )
+            for name in ('user', 'other')
+        )
+        cls.favorite, cls.in_cart, cls.plain = (
+            Recipe.objects.create(
+                author=cls.other,
+                name=name,
+                text='text',
+                image='recipes/images/recipe.png',
+                cooking_time=1,
+            )
+            for name in ('favorite', 'in_cart', 'plain')
+        )
+        Favourite.objects.create(user=cls.user, recipe=cls.favorite)
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.in_cart)
+        Favourite.objects.create(user=cls.other, recipe=cls.plain)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_flags(self, params=None):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return {
+            recipe['name']: (
+                recipe['is_favorited'],
+                recipe['is_in_shopping_cart'],
+            )
+            for recipe in response.json()['results']
+        }
+
+    def test_list_and_retrieve(self):
+        expected = {
+            'favorite': (True, False),
+            'in_cart': (False, True),
+            'plain': (False, False),
+        }
+        self.assertEqual(self.get_flags(), expected)
+        for recipe in (self.favorite, self.in_cart, self.plain):
+            with self.subTest(recipe=recipe.name):
+                data = self.client.get(f'/api/recipes/{recipe.pk}/').json()
+                self.assertEqual(
+                    (data['is_favorited'], data['is_in_shopping_cart']),
+                    expected[recipe.name],
+                )
+
+    def test_anonymous(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            set(self.get_flags().values()),
+            {(False, False)},
+        )
+
+    def test_flags_follow_toggles(self):
+        self.get_flags()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/recipes/{self.favorite.pk}/favorite/')
+            self.client.post(f'/api/recipes/{self.plain.pk}/shopping_cart/')
+        self.assertEqual(self.get_flags(), {
+            'favorite': (False, False),
+            'in_cart': (False, True),
+            'plain': (False, True),
+        })
+
+    def test_filters(self):
+        self.assertEqual(
+            list(self.get_flags({'is_favorited': 1})),
+            ['favorite'],
+        )
+        self.assertEqual(
+            list(self.get_flags({'is_in_shopping_cart': 1})),
+            ['in_cart'],
+        )
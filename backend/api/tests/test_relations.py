@@ -0,0 +1,142 @@
+from app.models import Favourite, Recipe, ShoppingCart
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
+class RelationToggleTest(TestCase):
+    """Favorites, the shopping cart and subscriptions are toggled once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = (
+            User.objects.create_user(
+                email=f'{name}@example.com',
+                username=name,
+                first_name=name,
+                last_name=name,
+                password='password',
+            )
+            for name in ('user', 'author')
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author,
+                name=f'recipe{i}',
+                text='text',
+                image='recipes/images/recipe.png',
+                cooking_time=1,
+            )
+            for i in range(3)
+        ]
+        cls.missing = max(recipe.pk for recipe in cls.recipes) + 1
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertStatuses(self, requests):
+        for method, url, status_code in requests:
+            with self.subTest(method=method, url=url):
+                response = getattr(self.client, method)(url)
+                self.assertEqual(response.status_code, status_code)
+
+    def test_recipe_toggles(self):
+        recipe = self.recipes[0]
+        for action, counter in (
+            ('favorite', 'favourites_count'),
+            ('shopping_cart', 'cart_count'),
+        ):
+            url = f'/api/recipes/{recipe.pk}/{action}/'
+            self.assertStatuses((
+                ('post', url, 201),
+                ('post', url, 400),
+                ('post', f'/api/recipes/{self.missing}/{action}/', 404),
+                ('post', f'/api/recipes/abc/{action}/', 404),
+            ))
+            recipe.refresh_from_db()
+            self.assertEqual(getattr(recipe, counter), 1)
+            self.assertStatuses((
+                ('delete', url, 204),
+                ('delete', url, 404),
+            ))
+            recipe.refresh_from_db()
+            self.assertEqual(getattr(recipe, counter), 0)
+
+    def test_subscribe(self):
+        url = f'/api/users/{self.author.pk}/subscribe/'
+        self.assertStatuses((
+            ('post', url, 201),
+            ('post', url, 400),
+            ('post', f'/api/users/{self.user.pk}/subscribe/', 400),
+            ('post', f'/api/users/{self.author.pk + 100}/subscribe/', 404),
+            ('delete', url, 204),
+            ('delete', url, 404),
+        ))
+
+    def test_anonymous(self):
+        self.client.force_authenticate(None)
+        self.assertStatuses((
+            ('post', f'/api/recipes/{self.recipes[0].pk}/favorite/', 401),
+            ('post', '/api/recipes/favorite/batch/', 401),
+        ))
+
+    def batch(self, method, action, ids):
+        response = getattr(self.client, method)(
+            f'/api/recipes/{action}/batch/',
+            {'recipes': ids},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        key = 'added' if method == 'post' else 'removed'
+        return sorted(response.json()[key])
+
+    def test_batch(self):
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        for action, model in (
+            ('favorite', Favourite),
+            ('shopping_cart', ShoppingCart),
+        ):
+            with self.subTest(action=action):
+                self.assertEqual(
+                    self.batch('post', action, [first, second, self.missing]),
+                    [first, second],
+                )
+                self.assertEqual(
+                    self.batch('post', action, [first, third]),
+                    [third],
+                )
+                self.assertEqual(
+                    self.batch('delete', action, [first, self.missing]),
+                    [first],
+                )
+                self.assertEqual(
+                    sorted(model.objects.filter(
+                        user=self.user,
+                    ).values_list('recipe', flat=True)),
+                    [second, third],
+                )
+
+    def test_batch_validation(self):
+        for data in (
+            {},
+            {'recipes': []},
+            {'recipes': ['abc']},
+            {'recipes': [0]},
+            {'recipes': list(range(1, 102))},
+        ):
+            with self.subTest(data=data):
+                response = self.client.post(
+                    '/api/recipes/favorite/batch/',
+                    data,
+                    format='json',
+                )
+                self.assertEqual(response.status_code, 400)
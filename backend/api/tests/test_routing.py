@@ -0,0 +1,80 @@
+import time
+from unittest import mock, skipUnless
+
+from app.models import Recipe
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+@skipUnless(
+    'replica_0' in settings.DATABASES,
+    'needs the replica_0 alias of foodgram_backend.test_settings',
+)
+@override_settings(
+    DATABASE_REPLICAS=['replica_0'],
+    REPLICA_PIN_TIMEOUT=5,
+    IMAGE_PROCESSING_WORKERS=0,
+)
+class ReplicaRoutingTest(TransactionTestCase):
+    """Safe reads go to a replica unless the client has just written."""
+
+    databases = {'default', 'replica_0'}
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        user = User.objects.create_user(
+            email='user@example.com',
+            username='user',
+            first_name='user',
+            last_name='user',
+            password='password',
+        )
+        with mock.patch('app.signals.schedule_variants'):
+            self.recipe = Recipe.objects.create(
+                author=user,
+                name='recipe',
+                text='text',
+                image='recipes/images/recipe.png',
+                cooking_time=1,
+            )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}',
+        )
+
+    def get_databases(self):
+        """Method returns the aliases the recipe list has read from."""
+
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections['replica_0']) as replica:
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return {
+            alias for alias, queries in (
+                ('default', default),
+                ('replica_0', replica),
+            )
+            if any('app_recipe' in query['sql'] for query in queries)
+        }
+
+    def test_safe_reads_go_to_replica(self):
+        self.assertEqual(self.get_databases(), {'replica_0'})
+
+    def test_client_is_pinned_after_write(self):
+        response = self.client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.get_databases(), {'default'})
+        expired = time.time() + settings.REPLICA_PIN_TIMEOUT + 1
+        with mock.patch('time.time', return_value=expired):
+            self.assertEqual(self.get_databases(), {'replica_0'})
@@ -0,0 +1,76 @@
+from unittest import mock
+
+from api.throttling import SlidingWindowThrottle
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+
+class ThrottledView:
+    action = 'list'
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'read': '2/min'},
+    'NUM_PROXIES': 1,
+})
+@mock.patch('api.throttling.time.time', return_value=600.0)
+class SlidingWindowThrottleTest(SimpleTestCase):
+    """Anonymous clients are throttled by their forwarded address."""
+
+    def setUp(self):
+        cache.clear()
+
+    def allow(self, address, remote_addr='127.0.0.1'):
+        request = Request(APIRequestFactory().get(
+            '/',
+            HTTP_X_FORWARDED_FOR=address,
+            REMOTE_ADDR=remote_addr,
+        ))
+        request.user = AnonymousUser()
+        return SlidingWindowThrottle().allow_request(request, ThrottledView())
+
+    def test_clients_have_separate_windows(self, _):
+        self.assertEqual(
+            [self.allow('10.0.0.1') for _ in range(3)],
+            [True, True, False],
+        )
+        self.assertTrue(self.allow('10.0.0.2'))
+
+    def test_rejected_requests_are_not_counted(self, _):
+        for _ in range(5):
+            self.allow('10.0.0.1')
+        self.assertEqual(cache.get('throttle:read:anon:10.0.0.1:10'), 2)
+
+    def test_client_address_is_added_by_the_proxy(self, _):
+        for address in ('10.0.0.1', '1.1.1.1, 10.0.0.1', '2.2.2.2, 10.0.0.1'):
+            self.allow(address)
+        self.assertEqual(cache.get('throttle:read:anon:10.0.0.1:10'), 2)
+        self.assertIsNone(cache.get('throttle:read:anon:1.1.1.1:10'))
+
+    def test_remote_address_without_proxies(self, _):
+        with override_settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'read': '2/min'},
+            'NUM_PROXIES': 0,
+        }):
+            self.allow('10.0.0.1', remote_addr='192.168.0.1')
+        self.assertEqual(cache.get('throttle:read:anon:192.168.0.1:10'), 1)
+        self.assertIsNone(cache.get('throttle:read:anon:10.0.0.1:10'))
+
+    def test_evicted_window_is_counted_again(self, _):
+        with mock.patch.object(cache, 'add'):
+            self.assertTrue(self.allow('10.0.0.1'))
+        self.assertEqual(cache.get('throttle:read:anon:10.0.0.1:10'), 1)
+
+    def test_window_evicted_before_uncounting(self, _):
+        self.allow('10.0.0.1')
+        self.allow('10.0.0.1')
+        with mock.patch.object(cache, 'decr', side_effect=ValueError):
+            self.assertFalse(self.allow('10.0.0.1'))
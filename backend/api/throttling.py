@@ -0,0 +1,91 @@
+import time
+
+from django.core.cache import cache as default_cache
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Per-user throttle with a separate sliding window for each scope.
+
+    The scope of an action is looked up in the throttle_scopes of the
+    view, other actions fall into the read or write scope. A rate like
+    60/min allows 60 requests in any minute. Scopes without a rate are
+    not throttled. Requests are counted per fixed window in the shared
+    cache with atomic add and incr, so concurrent workers never lose
+    a request, and the count of the previous window is weighted by
+    its part still inside the sliding window. A window evicted from
+    the cache while it is counted starts again from the request.
+    Rejected requests are uncounted and get a Retry-After header.
+    """
+
+    cache = default_cache
+    cache_format = 'throttle:{scope}:{ident}:{window}'
+
+    def get_scope(self, request, view):
+        default = 'read' if request.method in SAFE_METHODS else 'write'
+        scopes = getattr(view, 'throttle_scopes', {})
+        return scopes.get(getattr(view, 'action', None), default)
+
+    def get_rate(self, scope):
+        """Method returns the number of requests and the window length."""
+
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return None
+        num, period = rate.split('/')
+        return int(num), DURATIONS[period[0]]
+
+    def get_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'anon:{super().get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = self.get_rate(scope)
+        if rate is None:
+            return True
+        num, duration = rate
+        ident = self.get_ident(request)
+        now = time.time()
+        window, elapsed = divmod(now, duration)
+        key = self.cache_format.format(
+            scope=scope,
+            ident=ident,
+            window=int(window),
+        )
+        self.cache.add(key, 0, 2 * duration)
+        try:
+            current = self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 1, 2 * duration)
+            current = 1
+        previous = self.cache.get(self.cache_format.format(
+            scope=scope,
+            ident=ident,
+            window=int(window) - 1,
+        ), 0)
+        weight = 1 - elapsed / duration
+        if previous * weight + current <= num:
+            return True
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            pass
+        current -= 1
+        if current + 1 > num or not previous:
+            self.wait_time = duration - elapsed
+        else:
+            self.wait_time = duration * (
+                1 - (num - current - 1) / previous
+            ) - elapsed
+        return False
+
+    def wait(self):
+        return max(self.wait_time, 0)
@@ -3,6 +3,7 @@ from api.views import (
     IngredientViewSet,
     RecipeViewSet,
     TagViewSet,
+    metrics,
 )
 
 from django.urls import include, path
@@ -27,4 +28,5 @@ urlpatterns = [
     path('', include(djoser_urlpatterns)),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics/', metrics),
 ]
@@ -1,30 +1,69 @@
-from api.filters import IngredientSearchFilter, RecipeFilter
-from api.mixins import ListRetrieveCreateViewSet
-from api.pagination import LimitPageNumberPagination
+from api.filters import (
+    IngredientAutocompleteFilter,
+    IngredientSearchFilter,
+    RecipeFilter,
+)
+from api.mixins import (
+    AsyncViewSetMixin,
+    CachedReferenceDataMixin,
+    ConditionalGetMixin,
+    ListRetrieveCreateViewSet,
+    make_etag,
+)
+from api.pagination import KeysetPagination, OptionalKeysetPagination
 from api.permissions import IsAuthorOrReadOnly
+from api.renderers import (
+    CSVShoppingCartRenderer,
+    JSONShoppingCartRenderer,
+    TextShoppingCartRenderer,
+)
 from api.serializers import (
+    AvailableIngredientsSerializer,
+    CookableRecipeSerializer,
     CreateRecipeSerializer,
     CreateUserSerializer,
     FavouriteAndShoppingCartSerializer,
     FollowSerializer,
     IngredientSerializer,
+    RecipeIdsSerializer,
     RecipeSerializer,
+    RecipesLimitSerializer,
     TagSerializer,
     UserSerializer,
 )
 
+from app.cache import ingredient_cache, recipe_state_cache, tag_cache
+from app.metrics import export, record_event
 from app.models import (
     Favourite,
     Follow,
     Ingredient,
+    IngredientInRecipe,
     Recipe,
     ShoppingCart,
     Tag,
 )
+from app.relations import add_relations, remove_relations
+from app.search import search_by_ingredients
+
+from asgiref.sync import sync_to_async
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    Max,
+    OuterRef,
+    Prefetch,
+    Sum,
+    Value,
+)
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
 from django_filters.rest_framework import DjangoFilterBackend
@@ -36,19 +75,45 @@ from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 User = get_user_model()
 
+SHOPPING_CART_CHUNK_SIZE = 2000
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+def get_pk(model, pk):
+    """Function converts the pk from the url or raises Http404."""
 
-class TagViewSet(ReadOnlyModelViewSet):
+    try:
+        return model._meta.pk.to_python(pk)
+    except ValidationError:
+        raise Http404
+
+
+def invalidate_recipe_state(user):
+    """
+    Function drops the cached recipe state of the user once the change
+    of the favorites, shopping cart or subscriptions is committed.
+    """
+
+    transaction.on_commit(lambda: recipe_state_cache.invalidate(user.pk))
+
+
+class TagViewSet(CachedReferenceDataMixin, ReadOnlyModelViewSet):
     """ViewSet for the tag."""
 
+    read_from_replica = True
+    cache = tag_cache
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = (permissions.AllowAny,)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CachedReferenceDataMixin, ReadOnlyModelViewSet):
     """ViewSet for the ingredient."""
 
+    read_from_replica = True
+    cache = ingredient_cache
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
@@ -56,34 +121,106 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filter_backends = (IngredientSearchFilter,)
     search_fields = ('^name',)
 
+    @action(
+        detail=False,
+        url_path='autocomplete',
+        filter_backends=(IngredientAutocompleteFilter,),
+    )
+    async def autocomplete(self, request):
+        """
+        Method for ingredient autocomplete, returns
+        a limited number of the best matches by name.
+        """
+
+        return await self.cached_response(
+            request,
+            self.get_autocomplete_response,
+        )
 
-class CustomUserViewSet(ListRetrieveCreateViewSet):
+    def get_autocomplete_response(self, request):
+        """Method for building the uncached autocomplete response."""
+
+        try:
+            limit = int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            limit = AUTOCOMPLETE_LIMIT
+        limit = min(max(limit, 1), AUTOCOMPLETE_MAX_LIMIT)
+        queryset = self.filter_queryset(self.get_queryset())[:limit]
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class CustomUserViewSet(AsyncViewSetMixin, ListRetrieveCreateViewSet):
     """ViewSet for the user."""
 
+    read_from_replica = True
+    throttle_scopes = {'subscribe': 'toggle'}
     queryset = User.objects.all()
-    pagination_class = LimitPageNumberPagination
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('id',)
     permission_classes = (permissions.AllowAny,)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_subscribed=Value(False, output_field=BooleanField()),
+            )
+        return queryset.annotate(
+            is_subscribed=Exists(
+                Follow.objects.filter(user=user, following=OuterRef('pk')),
+            ),
+        )
+
     def get_serializer_class(self):
         if self.action == 'create':
             return CreateUserSerializer
         return UserSerializer
 
+    def get_recipes_limit(self):
+        """Method returns the validated recipes_limit query parameter."""
+
+        serializer = RecipesLimitSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes_limit']
+
     @action(
         detail=False,
         url_path='subscriptions',
         permission_classes=(permissions.IsAuthenticated,),
     )
-    def subscriptions(self, request):
+    async def subscriptions(self, request):
         """Method for demonstrating user subscriptions."""
 
+        return await sync_to_async(self.get_subscriptions_response)(request)
+
+    def get_subscriptions_response(self, request):
+        """Method for building the subscriptions page."""
+
         user = request.user
-        subscriptions = User.objects.filter(following__user=user)
+        recipes_limit = self.get_recipes_limit()
+        subscriptions = User.objects.filter(
+            following__user=user,
+        ).prefetch_related(
+            Prefetch(
+                'recipes',
+                queryset=Recipe.objects.only(
+                    'id',
+                    'author',
+                    'name',
+                    'image',
+                    'image_variants',
+                    'cooking_time',
+                )[:recipes_limit],
+                to_attr='preview_recipes',
+            ),
+        )
         page = self.paginate_queryset(subscriptions)
         serializer = FollowSerializer(
             page,
             many=True,
-            context={'request': request},
+            context={'request': request, 'recipes_limit': recipes_limit},
         )
         return self.get_paginated_response(data=serializer.data)
 
@@ -96,35 +233,39 @@ class CustomUserViewSet(ListRetrieveCreateViewSet):
         """Method of interaction with subscription."""
 
         user = request.user
-        following = get_object_or_404(User, pk=pk)
-        subscription = Follow.objects.filter(user=user, following=following)
+        pk = get_pk(User, pk)
         if request.method == 'POST':
-            if user == following:
+            if user.pk == pk:
                 return Response(
                     data={
                         'errors': 'subscribing to yourself is not possible',
                     },
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            if subscription.exists():
+            recipes_limit = self.get_recipes_limit()
+            followed = add_relations(Follow, user, [pk])
+            if not followed:
+                get_object_or_404(User, pk=pk)
                 return Response(
                     data={
                         'errors': 'the user is already in the subscriptions',
                     },
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            Follow.objects.create(user=user, following=following)
+            invalidate_recipe_state(user)
+            record_event('subscribed')
             serializer = FollowSerializer(
-                following,
-                context={'request': request},
+                followed[0],
+                context={'request': request, 'recipes_limit': recipes_limit},
             )
             return Response(
                 data=serializer.data,
                 status=status.HTTP_201_CREATED,
             )
         if request.method == 'DELETE':
-            if subscription.exists():
-                subscription.delete()
+            if remove_relations(Follow, user, [pk]):
+                invalidate_recipe_state(user)
+                record_event('unsubscribed')
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response(
                 data={"errors": "the user is not in subscriptions"},
@@ -132,36 +273,212 @@ class CustomUserViewSet(ListRetrieveCreateViewSet):
             )
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, ModelViewSet):
     """ViewSet for the recipe."""
 
+    read_from_replica = True
+    throttle_scopes = {
+        'create': 'recipe_write',
+        'partial_update': 'recipe_write',
+        'destroy': 'recipe_write',
+        'favorite': 'toggle',
+        'favorite_batch': 'toggle',
+        'shopping_cart': 'toggle',
+        'shopping_cart_batch': 'toggle',
+        'download_shopping_cart': 'download',
+    }
     queryset = Recipe.objects.all()
-    pagination_class = LimitPageNumberPagination
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('name', 'id')
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     http_method_names = ('get', 'post', 'patch', 'delete')
 
+    def get_queryset(self):
+        """
+        Builds a single queryset that carries everything
+        the recipe serializer needs, so rendering a page
+        does not issue additional queries per recipe.
+        """
+
+        queryset = super().get_queryset().select_related(
+            'author',
+        ).defer(
+            'search_vector',
+            'ingredient_ids',
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_in_recipes',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient',
+                ),
+            ),
+        )
+        user = self.request.user
+        if user.is_anonymous:
+            false = Value(False, output_field=BooleanField())
+            return queryset.annotate(
+                is_favorited=false,
+                is_in_shopping_cart=false,
+                is_subscribed=false,
+            )
+        return queryset.annotate(
+            is_subscribed=Exists(
+                Follow.objects.filter(
+                    user=user,
+                    following=OuterRef('author'),
+                ),
+            ),
+        )
+
+    def get_recipe_state(self):
+        """
+        Method returns the favorites and shopping cart of the user,
+        which the serializer uses instead of querying for each recipe.
+        """
+
+        if self.request.user.is_anonymous:
+            return None
+        if getattr(self, 'recipe_state', None) is None:
+            self.recipe_state = recipe_state_cache.get(self.request.user.pk)
+        return self.recipe_state
+
+    async def aget_recipe_state(self):
+        if self.request.user.is_anonymous:
+            return None
+        if getattr(self, 'recipe_state', None) is None:
+            self.recipe_state = await recipe_state_cache.aget(
+                self.request.user.pk,
+            )
+        return self.recipe_state
+
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update'):
             return CreateRecipeSerializer
         return RecipeSerializer
 
+    async def get_user_state(self):
+        """
+        Method returns the version of the favorites, shopping cart
+        and subscriptions of the current user, which is increased
+        on every committed change of them.
+        """
+
+        user = self.request.user
+        if user.is_anonymous:
+            return None
+        return await recipe_state_cache.aget_version(user.pk)
+
+    def cursor_not_supported(self):
+        """Method rejects a keyset cursor for a list ordered by rank."""
+
+        return Response(
+            data={'errors': 'cursor pagination is not supported'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    async def list(self, request, *args, **kwargs):
+        """
+        Method returns the list of recipes, answering with 304 when
+        neither the filtered recipes nor the user state have changed.
+        Search results are ordered by rank, so they are only paginated
+        by page numbers.
+        """
+
+        if request.query_params.get('search', '').strip() and (
+            KeysetPagination.cursor_query_param in request.query_params
+        ):
+            return self.cursor_not_supported()
+        queryset = await sync_to_async(self.filter_queryset)(
+            self.get_queryset(),
+        )
+        state = await queryset.aaggregate(
+            last_modified=Max('updated_at'),
+            count=Count('id'),
+        )
+        etag = make_etag(
+            request.user.pk,
+            request.get_full_path(),
+            state['last_modified'],
+            state['count'],
+            await self.get_user_state(),
+        )
+        return await self.conditional_response(
+            request, etag, None, self.list_queryset, queryset,
+        )
+
+    def list_queryset(self, request, queryset):
+        """Method paginates and serializes the already filtered recipes."""
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    async def retrieve(self, request, *args, **kwargs):
+        """
+        Method returns the recipe, answering with 304
+        when the client copy of the recipe is up to date.
+        """
+
+        try:
+            state = await self.get_queryset().filter(
+                pk=kwargs['pk'],
+            ).values_list(
+                'id',
+                'updated_at',
+                'is_subscribed',
+            ).afirst()
+        except (TypeError, ValueError):
+            state = None
+        if state is None:
+            return await sync_to_async(super().retrieve)(
+                request, *args, **kwargs,
+            )
+        recipe_id, updated_at, is_subscribed = state
+        recipe_state = await self.aget_recipe_state()
+        if recipe_state is not None:
+            state += (
+                recipe_state.is_favorited(recipe_id),
+                recipe_state.is_in_shopping_cart(recipe_id),
+            )
+        etag = make_etag(request.user.pk, *state)
+        last_modified = None
+        if request.user.is_anonymous:
+            last_modified = int(updated_at.timestamp())
+        return await self.conditional_response(
+            request, etag, last_modified, super().retrieve, *args, **kwargs,
+        )
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
+        context['recipe_state'] = self.get_recipe_state()
+        if self.action in ('list', 'cookable'):
+            context['image_variant'] = 'card'
         return context
 
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        record_event('recipe_created')
+
     def addition_and_removal(self, request, pk, query, msg):
         """
         Universal method for adding and removing
         objects from favorites and shopping lists.
+        Each change is a single idempotent statement,
+        see app.relations.
         """
 
         user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        obj = query.objects.filter(user=user, recipe=recipe)
+        pk = get_pk(Recipe, pk)
         if request.method == 'POST':
-            if obj.exists():
+            recipes = add_relations(query, user, [pk])
+            if not recipes:
+                get_object_or_404(Recipe, pk=pk)
                 return Response(
                     data={
                         'errors': 'the recipe has already '
@@ -169,21 +486,46 @@ class RecipeViewSet(ModelViewSet):
                     },
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            query.objects.create(user=user, recipe=recipe)
-            serializer = FavouriteAndShoppingCartSerializer(recipe)
+            invalidate_recipe_state(user)
+            record_event(f'{query._meta.model_name}_added')
+            serializer = FavouriteAndShoppingCartSerializer(recipes[0])
             return Response(
                 data=serializer.data,
                 status=status.HTTP_201_CREATED,
             )
         if request.method == 'DELETE':
-            if obj.exists():
-                obj.delete()
+            removed = remove_relations(query, user, [pk])
+            if removed:
+                invalidate_recipe_state(user)
+                record_event(f'{query._meta.model_name}_removed')
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response(
                 data={'errors': f'the recipe is not in {msg}'},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+    def batch_addition_and_removal(self, request, query):
+        """
+        Universal method for adding and removing many recipes
+        to favorites and shopping lists in one request. Unknown recipes
+        and recipes already in the wanted state are skipped, the ids
+        of the recipes that have changed are returned.
+        """
+
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            key, event = 'added', f'{query._meta.model_name}_added'
+            recipes = add_relations(query, request.user, ids)
+        else:
+            key, event = 'removed', f'{query._meta.model_name}_removed'
+            recipes = remove_relations(query, request.user, ids)
+        if recipes:
+            invalidate_recipe_state(request.user)
+            record_event(event, len(recipes))
+        return Response(data={key: [recipe.pk for recipe in recipes]})
+
     @action(
         methods=('post', 'delete'),
         detail=True,
@@ -194,6 +536,17 @@ class RecipeViewSet(ModelViewSet):
 
         return self.addition_and_removal(request, pk, Favourite, 'favorites')
 
+    @action(
+        methods=('post', 'delete'),
+        detail=False,
+        url_path='favorite/batch',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def favorite_batch(self, request):
+        """Method of interaction with many favorite recipes."""
+
+        return self.batch_addition_and_removal(request, Favourite)
+
     @action(
         methods=('post', 'delete'),
         detail=True,
@@ -209,13 +562,65 @@ class RecipeViewSet(ModelViewSet):
             'shopping cart',
         )
 
+    @action(
+        methods=('post', 'delete'),
+        detail=False,
+        url_path='shopping_cart/batch',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def shopping_cart_batch(self, request):
+        """Method of interaction with many recipes in shopping cart."""
+
+        return self.batch_addition_and_removal(request, ShoppingCart)
+
+    @action(detail=False)
+    def cookable(self, request):
+        """
+        Method returns the recipes that can be cooked from the ingredients
+        given in the ingredients parameter, the recipes missing the fewest
+        other ingredients first, then the quickest ones. The usual recipe
+        filters apply, max_missing limits the missing ingredients.
+        Pages are numbered, a keyset cursor would lose the ranking.
+        """
+
+        if KeysetPagination.cursor_query_param in request.query_params:
+            return self.cursor_not_supported()
+        data = {'ingredients': request.query_params.getlist('ingredients')}
+        if 'max_missing' in request.query_params:
+            data['max_missing'] = request.query_params['max_missing']
+        params = AvailableIngredientsSerializer(data=data)
+        params.is_valid(raise_exception=True)
+        queryset = search_by_ingredients(
+            self.filter_queryset(self.get_queryset()),
+            params.validated_data['ingredients'],
+            params.validated_data['max_missing'],
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = CookableRecipeSerializer(
+            page,
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=False,
         url_path='download_shopping_cart',
         permission_classes=(permissions.IsAuthenticated,),
+        renderer_classes=(
+            TextShoppingCartRenderer,
+            CSVShoppingCartRenderer,
+            JSONShoppingCartRenderer,
+        ),
     )
     def download_shopping_cart(self, request):
-        """Method for downloading ingredients from the shopping cart."""
+        """
+        Method for downloading ingredients from the shopping cart.
+        The format is selected by the format query parameter
+        or the Accept header, plain text is used by default.
+        Under ASGI the rows are streamed from an async iterator,
+        a sync one would be read into memory by the handler first.
+        """
 
         user = request.user
         if not user.shopping_carts.exists():
@@ -230,10 +635,40 @@ class RecipeViewSet(ModelViewSet):
             'measurement_unit',
         ).annotate(
             amount=Sum('ingredient_in_recipes__amount'),
+        ).order_by(
+            'name',
+            'measurement_unit',
+        )
+        renderer = request.accepted_renderer
+        if isinstance(request._request, ASGIRequest):
+            content = renderer.astream(
+                ingredients.aiterator(chunk_size=SHOPPING_CART_CHUNK_SIZE),
+            )
+        else:
+            content = renderer.stream(
+                ingredients.iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE),
+            )
+        response = StreamingHttpResponse(
+            content,
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping-list.{renderer.format}"'
         )
-        shopping_cart = [''.join(
-            f'{ingredient["name"]} '
-            f'({ingredient["measurement_unit"]}) - '
-            f'{ingredient["amount"]}\n'
-        ) for ingredient in ingredients]
-        return HttpResponse(shopping_cart, content_type='text/plain')
+        record_event('shopping_cart_downloaded')
+        return response
+
+
+def metrics(request):
+    """
+    View exposing the Prometheus metrics to a scraper sending
+    METRICS_TOKEN as a bearer token, without the token set
+    the metrics are not exposed.
+    """
+
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization')
+    if not token or authorization != f'Bearer {token}':
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    content, content_type = export()
+    return HttpResponse(content, content_type=content_type)
@@ -53,12 +53,14 @@ class RecipeAdmin(admin.ModelAdmin):
 
     list_display = ('author', 'name', 'get_is_favorited')
     list_filter = ('author', 'name', 'tags')
+    list_select_related = ('author',)
+    readonly_fields = ('favourites_count', 'cart_count')
     inlines = (IngredientInRecipeInline, TagForRecipeInline)
 
     def get_is_favorited(self, obj):
-        """Method counts the number of recipe additions to favorites."""
+        """Method returns the number of recipe additions to favorites."""
 
-        return obj.favourites.count()
+        return obj.favourites_count
 
     get_is_favorited.short_description = 'number of additions to favorites'
 
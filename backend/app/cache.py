@@ -0,0 +1,256 @@
+import hashlib
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from app.metrics import CACHE_REQUESTS
+from app.models import Favourite, ShoppingCart
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.db.models import Value
+
+
+class VersionedCache:
+    """
+    Two-tier cache for rarely changing data.
+
+    Entries are kept in a small in-process LRU in front of a shared
+    Django cache backend. Each entry is bound to the current version
+    of the namespace, so bumping the version invalidates the entries
+    of every process at once. Lookups go through the async API
+    of the backend, the local tier is served without awaiting.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[settings.REFERENCE_CACHE_ALIAS]
+
+    @property
+    def version_key(self):
+        return f'{self.namespace}:version'
+
+    def make_key(self, key, version):
+        digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+        return f'{self.namespace}:{version}:{digest}'
+
+    async def aget_version(self):
+        """
+        Method returns the current version of the namespace,
+        which is the timestamp of its last invalidation.
+        """
+
+        version = await self.backend.aget(self.version_key)
+        if version is None:
+            await self.backend.aadd(
+                self.version_key,
+                time.time(),
+                timeout=None,
+            )
+            version = await self.backend.aget(self.version_key)
+        return version
+
+    async def aget(self, key, version):
+        """Method for getting an entry of the given version."""
+
+        cache_key = self.make_key(key, version)
+        with self._lock:
+            if cache_key in self._local:
+                self._local.move_to_end(cache_key)
+                CACHE_REQUESTS.labels(self.namespace, 'local_hit').inc()
+                return self._local[cache_key]
+        value = await self.backend.aget(cache_key)
+        if value is not None:
+            self._set_local(cache_key, value)
+        CACHE_REQUESTS.labels(
+            self.namespace,
+            'miss' if value is None else 'hit',
+        ).inc()
+        return value
+
+    async def aset(self, key, value, version):
+        """Method for storing an entry of the given version."""
+
+        cache_key = self.make_key(key, version)
+        await self.backend.aset(
+            cache_key,
+            value,
+            timeout=settings.REFERENCE_CACHE_TIMEOUT,
+        )
+        self._set_local(cache_key, value)
+
+    def invalidate(self):
+        """
+        Method invalidates all entries of the namespace,
+        to be called once the change of the data is committed.
+        """
+
+        self.backend.set(self.version_key, time.time(), timeout=None)
+        with self._lock:
+            self._local.clear()
+
+    def _set_local(self, cache_key, value):
+        with self._lock:
+            self._local[cache_key] = value
+            self._local.move_to_end(cache_key)
+            while len(self._local) > settings.REFERENCE_CACHE_LOCAL_SIZE:
+                self._local.popitem(last=False)
+
+
+tag_cache = VersionedCache('tags')
+ingredient_cache = VersionedCache('ingredients')
+
+
+class UserRecipeState:
+    """
+    Ids of the recipes in the favorites and the shopping cart of a user.
+    The ids are kept as sorted arrays of 64-bit integers, which take
+    8 bytes per recipe in the cache and are searched by bisection.
+    """
+
+    models = (Favourite, ShoppingCart)
+
+    def __init__(self, rows=()):
+        ids = {model._meta.model_name: [] for model in self.models}
+        for kind, recipe_id in rows:
+            ids[kind].append(recipe_id)
+        self.ids = {
+            kind: array('q', sorted(recipe_ids))
+            for kind, recipe_ids in ids.items()
+        }
+
+    def contains(self, kind, recipe_id):
+        ids = self.ids[kind]
+        index = bisect_left(ids, recipe_id)
+        return index < len(ids) and ids[index] == recipe_id
+
+    def is_favorited(self, recipe_id):
+        return self.contains('favourite', recipe_id)
+
+    def is_in_shopping_cart(self, recipe_id):
+        return self.contains('shoppingcart', recipe_id)
+
+
+class RecipeStateCache:
+    """
+    Shared cache of the favorites and shopping cart of each user.
+
+    A missing state is loaded from the primary database with one query.
+    The state of a user is stored under the current version of the user,
+    a counter increased on each committed change of the favorites, the
+    shopping cart or the subscriptions, so a state loaded concurrently
+    from older data is stored under the old version and never read,
+    and no update can be lost. A missing version starts from the current
+    time in nanoseconds, above any version seen before it expired.
+    Entries and versions expire after RECIPE_STATE_CACHE_TIMEOUT seconds.
+    """
+
+    @property
+    def backend(self):
+        return caches[settings.RECIPE_STATE_CACHE_ALIAS]
+
+    def make_version_key(self, user_id):
+        return f'recipe_state:{user_id}:version'
+
+    def make_key(self, user_id, version):
+        return f'recipe_state:{user_id}:{version}'
+
+    def get_queryset(self, user_id):
+        querysets = [
+            model.objects.using(router.db_for_write(model)).filter(
+                user_id=user_id,
+            ).order_by().annotate(
+                kind=Value(model._meta.model_name),
+            ).values_list('kind', 'recipe_id')
+            for model in UserRecipeState.models
+        ]
+        return querysets[0].union(*querysets[1:], all=True)
+
+    def get_version(self, user_id):
+        key = self.make_version_key(user_id)
+        version = self.backend.get(key)
+        if version is None:
+            self.backend.add(
+                key,
+                time.time_ns(),
+                timeout=settings.RECIPE_STATE_CACHE_TIMEOUT,
+            )
+            version = self.backend.get(key)
+        return version
+
+    async def aget_version(self, user_id):
+        key = self.make_version_key(user_id)
+        version = await self.backend.aget(key)
+        if version is None:
+            await self.backend.aadd(
+                key,
+                time.time_ns(),
+                timeout=settings.RECIPE_STATE_CACHE_TIMEOUT,
+            )
+            version = await self.backend.aget(key)
+        return version
+
+    def get(self, user_id):
+        """Method returns the recipe state of the user."""
+
+        key = self.make_key(user_id, self.get_version(user_id))
+        state = self.backend.get(key)
+        CACHE_REQUESTS.labels(
+            'recipe_state',
+            'miss' if state is None else 'hit',
+        ).inc()
+        if state is None:
+            state = UserRecipeState(self.get_queryset(user_id))
+            self.backend.set(
+                key,
+                state,
+                timeout=settings.RECIPE_STATE_CACHE_TIMEOUT,
+            )
+        return state
+
+    async def aget(self, user_id):
+        """Method returns the recipe state of the user."""
+
+        key = self.make_key(user_id, await self.aget_version(user_id))
+        state = await self.backend.aget(key)
+        CACHE_REQUESTS.labels(
+            'recipe_state',
+            'miss' if state is None else 'hit',
+        ).inc()
+        if state is None:
+            state = UserRecipeState(
+                [row async for row in self.get_queryset(user_id)],
+            )
+            await self.backend.aset(
+                key,
+                state,
+                timeout=settings.RECIPE_STATE_CACHE_TIMEOUT,
+            )
+        return state
+
+    def invalidate(self, user_id):
+        """
+        Method increases the version of the user, to be called once the
+        change of the favorites, shopping cart or subscriptions is committed.
+        """
+
+        key = self.make_version_key(user_id)
+        try:
+            self.backend.incr(key)
+        except ValueError:
+            self.backend.add(
+                key,
+                time.time_ns(),
+                timeout=settings.RECIPE_STATE_CACHE_TIMEOUT,
+            )
+
+
+recipe_state_cache = RecipeStateCache()
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+# Caches holding state that every worker process has to see:
+# invalidations, replica pins, throttle counters and recipe states.
+SHARED_CACHE_SETTINGS = (
+    'REFERENCE_CACHE_ALIAS',
+    'REPLICA_PIN_CACHE_ALIAS',
+    'RECIPE_STATE_CACHE_ALIAS',
+    'TOKEN_CACHE_ALIAS',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    """
+    Function checks that the caches shared by the worker processes
+    are not process-local, run by manage.py check --deploy.
+    """
+
+    aliases = {'default'} | {
+        getattr(settings, name) for name in SHARED_CACHE_SETTINGS
+    }
+    return [
+        Error(
+            f'The {alias!r} cache uses the process-local '
+            f'{settings.CACHES[alias]["BACKEND"]}.',
+            hint='Set CACHE_BACKEND and CACHE_LOCATION to a shared cache, '
+                 'e.g. django.core.cache.backends.redis.RedisCache.',
+            id='app.E001',
+        )
+        for alias in sorted(aliases)
+        if settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_CACHES
+    ]
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+COUNTERS = (
+    ('app.Recipe', 'favourites_count', 'app.Favourite', 'recipe'),
+    ('app.Recipe', 'cart_count', 'app.ShoppingCart', 'recipe'),
+    (settings.AUTH_USER_MODEL, 'recipes_count', 'app.Recipe', 'author'),
+    (settings.AUTH_USER_MODEL, 'followers_count', 'app.Follow', 'following'),
+)
+
+
+def change_counters(apps, instance, delta):
+    """
+    Atomically changes by delta the counters
+    that count objects of the instance model.
+    """
+
+    for model_label, field, counted_label, foreign_key in COUNTERS:
+        if instance._meta.label != counted_label:
+            continue
+        apps.get_model(model_label).objects.filter(
+            pk=getattr(instance, f'{foreign_key}_id'),
+        ).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def recount_counters(apps):
+    """
+    Recounts the counters that have drifted from the actual
+    number of objects, returns the number of fixed rows per counter.
+    """
+
+    fixed = {}
+    for model_label, field, counted_label, foreign_key in COUNTERS:
+        model = apps.get_model(model_label)
+        actual = Coalesce(
+            Subquery(
+                apps.get_model(counted_label).objects.filter(
+                    **{foreign_key: OuterRef('pk')},
+                ).order_by().values(foreign_key).annotate(
+                    count=Count('pk'),
+                ).values('count'),
+            ),
+            0,
+        )
+        drifted = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')},
+        )
+        fixed[f'{model_label}.{field}'] = model.objects.filter(
+            pk__in=drifted.values('pk'),
+        ).update(**{field: actual})
+    return fixed
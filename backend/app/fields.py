@@ -0,0 +1,14 @@
+from django.contrib.postgres.fields import ArrayField
+
+
+class PostgreSQLArrayField(ArrayField):
+    """
+    Array field that is filled only on PostgreSQL.
+    On other databases the column is kept NULL, so the value
+    is written without the PostgreSQL array cast.
+    """
+
+    def get_placeholder(self, value, compiler, connection):
+        if connection.vendor == 'postgresql':
+            return super().get_placeholder(value, compiler, connection)
+        return '%s'
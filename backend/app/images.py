@@ -0,0 +1,153 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from app.models import Recipe
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+VARIANTS_DIR = 'images/variants'
+WEBP = 'webp'
+
+_executor = None
+
+
+def get_executor():
+    """Function returns the worker pool of the process."""
+
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='image-processing',
+        )
+    return _executor
+
+
+def schedule_variants(recipe_id):
+    """
+    Function schedules building of the recipe image variants.
+    With IMAGE_PROCESSING_WORKERS set to 0 the variants are built
+    in the calling thread, which is what the tests rely on.
+    """
+
+    if settings.IMAGE_PROCESSING_WORKERS == 0:
+        process_recipe_image(recipe_id)
+        return
+    get_executor().submit(_process_in_worker, recipe_id)
+
+
+def _process_in_worker(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Failed to process image of recipe %s', recipe_id)
+    finally:
+        connections.close_all()
+
+
+def process_recipe_image(recipe_id):
+    """
+    Function builds the variants of the recipe image and stores them
+    unless the image has been replaced in the meantime.
+    """
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image',
+        'image_variants',
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+    source = recipe.image.name
+    variants = build_variants(recipe.image)
+    updated = Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image_variants=variants,
+        updated_at=timezone.now(),
+    )
+    stale = variants if not updated else recipe.image_variants
+    delete_variants(recipe.image.storage, stale)
+
+
+def has_variants(recipe):
+    """Function checks that the variants of the current image are built."""
+
+    return recipe.image_variants.get('source') == recipe.image.name
+
+
+def build_variants(image):
+    """
+    Function resizes the image to every variant and saves each of them
+    in the original format and in WebP, returns the saved file names.
+    """
+
+    storage = image.storage
+    with image.open('rb'):
+        original = Image.open(image)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+    has_alpha = original.mode in ('RGBA', 'LA', 'PA') or (
+        'transparency' in original.info
+    )
+    image_format = 'png' if has_alpha else 'jpeg'
+    if not has_alpha:
+        original = original.convert('RGB')
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    variants = {'source': image.name}
+    for variant, size in VARIANTS.items():
+        resized = original.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        variants[variant] = {}
+        for variant_format in (image_format, WEBP):
+            content = BytesIO()
+            resized.save(
+                content,
+                format=variant_format.upper(),
+                quality=85,
+                optimize=True,
+            )
+            variants[variant][variant_format] = storage.save(
+                f'{VARIANTS_DIR}/{stem}_{variant}.{variant_format}',
+                ContentFile(content.getvalue()),
+            )
+    return variants
+
+
+def delete_variants(storage, variants):
+    """Function deletes the files of previously built variants."""
+
+    for variant in VARIANTS:
+        for name in variants.get(variant, {}).values():
+            storage.delete(name)
+
+
+def get_variant_urls(recipe):
+    """
+    Function returns the urls of the recipe image variants,
+    falling back to the original image while they are being built.
+    """
+
+    storage = recipe.image.storage
+    variants = recipe.image_variants
+    if not has_variants(recipe):
+        url = recipe.image.url
+        return {variant: {'image': url} for variant in VARIANTS}
+    return {
+        variant: {
+            ('image' if variant_format != WEBP else WEBP): storage.url(name)
+            for variant_format, name in variants[variant].items()
+        }
+        for variant in VARIANTS
+    }
@@ -0,0 +1,429 @@
+import itertools
+import json
+import multiprocessing
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+
+from app.models import Follow, Ingredient, Recipe, ShoppingCart, Tag
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Count, Sum
+from django.http import HttpResponse
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext, override_settings
+
+import requests
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/?format=txt'
+
+
+def legacy_download_shopping_cart(user):
+    """
+    Function builds the shopping cart the way download_shopping_cart
+    did before it was streamed, as a list held in memory.
+    """
+
+    ingredients = Ingredient.objects.filter(
+        ingredient_in_recipes__recipe__shopping_carts__user=user,
+    ).values(
+        'name',
+        'measurement_unit',
+    ).annotate(
+        amount=Sum('ingredient_in_recipes__amount'),
+    )
+    shopping_cart = [''.join(
+        f'{ingredient["name"]} '
+        f'({ingredient["measurement_unit"]}) - '
+        f'{ingredient["amount"]}\n'
+    ) for ingredient in ingredients]
+    return HttpResponse(shopping_cart, content_type='text/plain')
+
+
+def measure_download(implementation, user_id):
+    """
+    Function downloads the shopping cart of the user in a forked
+    process and returns the time to the first byte, the total time
+    and how much the peak resident memory of the process has grown.
+    """
+
+    try:
+        user = User.objects.get(pk=user_id)
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        if implementation == 'legacy':
+            chunks = iter([legacy_download_shopping_cart(user).content])
+        else:
+            client = APIClient()
+            client.force_authenticate(user)
+            chunks = iter(client.get(DOWNLOAD_URL).streaming_content)
+        size = len(next(chunks, b''))
+        ttfb = time.perf_counter() - started
+        size += sum(len(chunk) for chunk in chunks)
+        elapsed = time.perf_counter() - started
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {
+            'name': f'recipes.download_shopping_cart [{implementation}]',
+            'bytes': size,
+            'ttfb_ms': round(ttfb * 1000, 2),
+            'total_ms': round(elapsed * 1000, 2),
+            'rss_growth_kib': peak - baseline,
+        }
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """
+    Command to benchmark the API hot paths in process against
+    the configured database. For every endpoint it records the number
+    of queries, p50 and p95 latency and peak memory allocated.
+    With --base-url a running server is loaded over http instead by
+    concurrent clients, to compare requests per second between
+    deployments, e.g. gunicorn sync workers and uvicorn workers.
+    Throttling is disabled in process, the server loaded over http
+    needs its THROTTLE_*_RATE settings raised or cleared.
+    The streaming scenarios are also run in process through the ASGI
+    handler, marked [asgi], to catch responses buffered under ASGI,
+    and the shopping cart download is compared with the legacy one
+    by time to first byte and peak resident memory.
+    """
+
+    asgi_scenarios = ('recipes.download_shopping_cart',)
+    followed_authors = 500
+
+    help = 'Benchmarks the API endpoints against the current database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--user',
+            help='email of the user to authenticate as, by default '
+                 'the user with the largest shopping cart',
+        )
+        parser.add_argument(
+            '--filter',
+            help='run only the scenarios containing this substring',
+        )
+        parser.add_argument('--json', help='file to write the results to')
+        parser.add_argument(
+            '--base-url',
+            help='url of a running server to load over http, '
+                 'e.g. http://localhost:8000',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='number of concurrent http clients',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='seconds each scenario is loaded over http',
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        if options['base_url']:
+            self.handle_http(user, options)
+            return
+        client = APIClient()
+        client.force_authenticate(user)
+        token, _ = Token.objects.get_or_create(user=user)
+        self.headers = {'Authorization': f'Token {token.key}'}
+        async_client = AsyncClient()
+        results = []
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            REST_FRAMEWORK={
+                **settings.REST_FRAMEWORK,
+                'DEFAULT_THROTTLE_RATES': {},
+            },
+        ):
+            for name, url in self.get_scenarios():
+                if options['filter'] and options['filter'] not in name:
+                    continue
+                clients = [(name, client)]
+                if name.startswith(self.asgi_scenarios):
+                    clients.append((f'{name} [asgi]', async_client))
+                for client_name, scenario_client in clients:
+                    results.append(self.measure(
+                        scenario_client,
+                        client_name,
+                        url,
+                        options['repeat'],
+                        options['warmup'],
+                    ))
+                    self.report(results[-1])
+            if not options['filter'] or options['filter'] in (
+                'users.subscriptions?following'
+            ):
+                results.append(self.measure_follower(
+                    options['repeat'],
+                    options['warmup'],
+                ))
+                self.report(results[-1])
+            if not options['filter'] or options['filter'] in (
+                'recipes.download_shopping_cart [legacy]'
+            ):
+                for result in self.compare_download(user):
+                    results.append(result)
+                    self.report_download(result)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+
+    def measure_follower(self, repeat, warmup):
+        """
+        Method measures the subscriptions of a temporary user following
+        the authors with the most recipes, which is rolled back after.
+        """
+
+        with transaction.atomic():
+            follower = User.objects.create_user(
+                email='benchmark-follower@example.com',
+                username='benchmark-follower',
+                first_name='Benchmark',
+                last_name='Follower',
+            )
+            authors = User.objects.exclude(pk=follower.pk).order_by(
+                '-recipes_count',
+                'id',
+            ).values_list('id', flat=True)[:self.followed_authors]
+            Follow.objects.bulk_create(
+                Follow(user=follower, following_id=author)
+                for author in authors
+            )
+            client = APIClient()
+            client.force_authenticate(follower)
+            result = self.measure(
+                client,
+                f'users.subscriptions?following={len(authors)}',
+                '/api/users/subscriptions/?limit=100',
+                repeat,
+                warmup,
+            )
+            transaction.set_rollback(True)
+        return result
+
+    def compare_download(self, user):
+        """
+        Method compares the streamed shopping cart download with the
+        legacy one building the whole file in memory. Each runs in
+        a fresh forked process, so that the peak resident memory of
+        one does not hide the other.
+        """
+
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = []
+        for implementation in ('legacy', 'streaming'):
+            with context.Pool(1) as pool:
+                results.append(pool.apply(
+                    measure_download,
+                    (implementation, user.pk),
+                ))
+        return results
+
+    def handle_http(self, user, options):
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {'Authorization': f'Token {token.key}'}
+        results = []
+        for name, url in self.get_scenarios():
+            if options['filter'] and options['filter'] not in name:
+                continue
+            results.append(self.measure_http(
+                options['base_url'].rstrip('/') + url,
+                name,
+                headers,
+                options['concurrency'],
+                options['duration'],
+                options['warmup'],
+            ))
+            self.report_http(results[-1])
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+
+    def get_user(self, email):
+        if email:
+            user = User.objects.filter(email=email).first()
+        else:
+            cart = ShoppingCart.objects.order_by().values('user').annotate(
+                size=Count('id'),
+            ).order_by('-size').first()
+            user = cart and User.objects.get(pk=cart['user'])
+        if user is None:
+            raise CommandError(
+                'No user to benchmark as, run generate_fake_data first'
+            )
+        return user
+
+    def get_scenarios(self):
+        """Generator yielding the scenario names and urls."""
+
+        author = Recipe.objects.values_list('author', flat=True).first()
+        slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+        filters = (
+            ('', 'is_favorited=1'),
+            ('', 'is_in_shopping_cart=1'),
+            ('', f'author={author}'),
+            tuple(
+                '&'.join(f'tags={slug}' for slug in slugs[:count])
+                for count in range(len(slugs) + 1)
+            ),
+        )
+        for combination in itertools.product(*filters):
+            query = '&'.join(part for part in combination if part)
+            yield f'recipes.list?{query}', f'/api/recipes/?{query}'
+        recipe = Recipe.objects.values_list('id', flat=True).first()
+        yield 'recipes.retrieve', f'/api/recipes/{recipe}/'
+        ingredients = '&'.join(
+            f'ingredients={pk}'
+            for pk in Ingredient.objects.values_list('id', flat=True)[:5]
+        )
+        yield 'recipes.cookable', f'/api/recipes/cookable/?{ingredients}'
+        for file_format in ('txt', 'csv', 'json'):
+            yield (
+                f'recipes.download_shopping_cart?format={file_format}',
+                f'/api/recipes/download_shopping_cart/?format={file_format}',
+            )
+        yield 'users.subscriptions', '/api/users/subscriptions/'
+        yield 'tags.list', '/api/tags/'
+        prefix = (Ingredient.objects.values_list('name', flat=True).first()
+                  or '')[:3]
+        yield 'ingredients.list?name', f'/api/ingredients/?name={prefix}'
+        yield (
+            'ingredients.autocomplete?name',
+            f'/api/ingredients/autocomplete/?name={prefix}',
+        )
+
+    def request(self, client, url):
+        if isinstance(client, AsyncClient):
+            return async_to_sync(self.arequest)(client, url)
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    async def arequest(self, client, url):
+        """
+        Method reads the response like the ASGI handler does,
+        a sync streaming response is read into a list first.
+        """
+
+        response = await client.get(url, headers=self.headers)
+        if response.streaming and response.is_async:
+            async for _ in response.streaming_content:
+                pass
+        elif response.streaming:
+            await sync_to_async(list)(response.streaming_content)
+        return response
+
+    def measure(self, client, name, url, repeat, warmup):
+        for _ in range(warmup):
+            self.request(client, url)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            self.request(client, url)
+            timings.append((time.perf_counter() - started) * 1000)
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            response = self.request(client, url)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        percentiles = statistics.quantiles(timings, n=20, method='inclusive')
+        return {
+            'name': name,
+            'status': response.status_code,
+            'queries': len(queries.captured_queries),
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentiles[18], 2),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def measure_http(self, url, name, headers, concurrency, duration,
+                     warmup):
+        """
+        Method loads the url with concurrent clients for the duration
+        and returns the throughput and latency percentiles.
+        """
+
+        timings = []
+        statuses = set()
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def client():
+            with requests.Session() as session:
+                session.headers.update(headers)
+                for _ in range(warmup):
+                    session.get(url)
+                local = []
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    response = session.get(url)
+                    local.append((time.perf_counter() - started) * 1000)
+                    statuses.add(response.status_code)
+            with lock:
+                timings.extend(local)
+
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=client) for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        percentiles = statistics.quantiles(
+            timings or [0, 0], n=20, method='inclusive',
+        )
+        return {
+            'name': name,
+            'status': ','.join(map(str, sorted(statuses))),
+            'concurrency': concurrency,
+            'requests': len(timings),
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(statistics.median(timings or [0]), 2),
+            'p95_ms': round(percentiles[18], 2),
+        }
+
+    def report_http(self, result):
+        self.stdout.write(
+            '{name:<70} {status:>8} c{concurrency:<4} '
+            '{rps:>9.1f} req/s p50 {p50_ms:>8.2f}ms '
+            'p95 {p95_ms:>8.2f}ms'.format(**result)
+        )
+
+    def report_download(self, result):
+        self.stdout.write(
+            '{name:<70} {bytes:>9}B ttfb {ttfb_ms:>8.2f}ms '
+            'total {total_ms:>8.2f}ms rss +{rss_growth_kib}KiB'.format(
+                **result,
+            )
+        )
+
+    def report(self, result):
+        self.stdout.write(
+            '{name:<70} {status:>4} {queries:>4}q '
+            'p50 {p50_ms:>8.2f}ms p95 {p95_ms:>8.2f}ms '
+            'peak {peak_kib:>9.1f}KiB'.format(**result)
+        )
@@ -0,0 +1,36 @@
+from app.images import has_variants, process_recipe_image
+from app.models import Recipe
+
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Command to build the image variants of the recipes that are
+    missing them, e.g. because the process building them in the
+    background was restarted before it finished. With --all the
+    variants of every recipe are rebuilt.
+    """
+
+    help = 'Builds the missing recipe image variants.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='rebuild the variants of all recipes',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only(
+            'image',
+            'image_variants',
+        ).order_by('id')
+        built = 0
+        for recipe in recipes.iterator():
+            if options['all'] or not has_variants(recipe):
+                process_recipe_image(recipe.pk)
+                built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Image variants of {built} recipes have been built'
+        ))
@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+
+from app.models import IngredientInRecipe, Recipe
+
+from django.core.management import BaseCommand
+from django.db.models import Prefetch
+
+RECIPES_FILE = 'recipes.ndjson'
+
+
+class Command(BaseCommand):
+    """
+    Command to export recipes to a directory as newline-delimited json,
+    recipe images are copied next to it as side files.
+    """
+
+    help = 'Exports recipes as ndjson with images as side files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='output directory')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='number of recipes fetched from the database at once',
+        )
+        parser.add_argument(
+            '--no-images',
+            action='store_true',
+            help='do not copy the image files',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        os.makedirs(directory, exist_ok=True)
+        recipes = Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_in_recipes',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient',
+                ),
+            ),
+        ).order_by('id')
+        exported = 0
+        with open(
+                os.path.join(directory, RECIPES_FILE),
+                'w',
+                encoding='utf-8',
+        ) as file:
+            for recipe in recipes.iterator(chunk_size=options['chunk_size']):
+                if not options['no_images']:
+                    self.copy_image(recipe.image, directory)
+                file.write(json.dumps(
+                    self.serialize(recipe),
+                    ensure_ascii=False,
+                ) + '\n')
+                exported += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'{exported} recipes have been exported to {directory}')
+        )
+
+    def serialize(self, recipe):
+        return {
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'author': recipe.author.email,
+            'image': recipe.image.name,
+            'tags': [tag.slug for tag in recipe.tags.all()],
+            'ingredients': [
+                {
+                    'name': obj.ingredient.name,
+                    'measurement_unit': obj.ingredient.measurement_unit,
+                    'amount': obj.amount,
+                }
+                for obj in recipe.ingredient_in_recipes.all()
+            ],
+        }
+
+    def copy_image(self, image, directory):
+        if not image:
+            return
+        target = os.path.join(directory, image.name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with image.storage.open(image.name, 'rb') as source, open(
+                target,
+                'wb',
+        ) as destination:
+            shutil.copyfileobj(source, destination)
@@ -0,0 +1,183 @@
+import io
+import random
+
+from PIL import Image
+
+from app.counters import recount_counters
+from app.management.utils import batched
+from app.models import (
+    Favourite,
+    Follow,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+    TagForRecipe,
+)
+from app.search import update_ingredient_ids, update_search_vectors
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand
+from django.db import transaction
+
+User = get_user_model()
+
+DEFAULT_TAGS = (
+    ('Breakfast', '#E26C2D', 'breakfast'),
+    ('Lunch', '#49B64E', 'lunch'),
+    ('Dinner', '#8775D2', 'dinner'),
+)
+WORDS = (
+    'apple', 'bean', 'carrot', 'dill', 'egg', 'fig', 'garlic', 'honey',
+    'leek', 'mint', 'nut', 'onion', 'pepper', 'rice', 'salt', 'tomato',
+)
+
+
+class Command(BaseCommand):
+    """
+    Command to deterministically fill the database with synthetic
+    users, recipes, favorites, shopping carts and subscriptions.
+    """
+
+    help = 'Generates synthetic data for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--favourites-per-user', type=int, default=20)
+        parser.add_argument('--carts-per-user', type=int, default=5)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            tag_ids = self.get_tag_ids()
+            ingredient_ids = self.get_ingredient_ids()
+            user_ids = self.create_users(options['users'], options['seed'])
+            recipe_ids = self.create_recipes(options['recipes'], user_ids)
+            self.bulk_create(
+                IngredientInRecipe(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 500),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in self.sample(
+                    ingredient_ids,
+                    options['ingredients_per_recipe'],
+                )
+            )
+            self.bulk_create(
+                TagForRecipe(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in self.sample(tag_ids, options['tags_per_recipe'])
+            )
+            for model, per_user in (
+                (Favourite, options['favourites_per_user']),
+                (ShoppingCart, options['carts_per_user']),
+            ):
+                self.bulk_create(
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id in user_ids
+                    for recipe_id in self.sample(recipe_ids, per_user)
+                )
+            self.bulk_create(
+                Follow(user_id=user_id, following_id=following_id)
+                for user_id in user_ids
+                for following_id in self.sample(
+                    user_ids,
+                    options['follows_per_user'],
+                    exclude=user_id,
+                )
+            )
+            recount_counters(apps)
+            update_search_vectors(apps, recipe_ids)
+            update_ingredient_ids(apps, recipe_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(user_ids)} users and {len(recipe_ids)} recipes '
+            f'have been generated')
+        )
+
+    def sample(self, population, size, exclude=None):
+        sample = self.random.sample(population, min(size, len(population)))
+        return [item for item in sample if item != exclude]
+
+    def bulk_create(self, objects):
+        for batch in batched(objects, self.batch_size):
+            type(batch[0]).objects.bulk_create(batch)
+
+    def get_tag_ids(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS
+            )
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def get_ingredient_ids(self):
+        if not Ingredient.objects.exists():
+            Ingredient.objects.bulk_create(
+                Ingredient(name=f'{first} {second}', measurement_unit='g')
+                for first in WORDS
+                for second in WORDS
+            )
+        return list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+
+    def create_users(self, count, seed):
+        password = make_password('password')
+        prefix = f'fake{seed}-{User.objects.count()}'
+        self.bulk_create(
+            User(
+                email=f'{prefix}-{index}@example.com',
+                username=f'{prefix}-{index}',
+                first_name=self.random.choice(WORDS).title(),
+                last_name=self.random.choice(WORDS).title(),
+                password=password,
+            )
+            for index in range(count)
+        )
+        return list(
+            User.objects.filter(
+                email__startswith=f'{prefix}-',
+            ).order_by('id').values_list('id', flat=True)
+        )
+
+    def create_recipes(self, count, user_ids):
+        image = self.create_image()
+        start = Recipe.objects.count()
+        self.bulk_create(
+            Recipe(
+                author_id=self.random.choice(user_ids),
+                name=f'{self.random.choice(WORDS)} {start + index}',
+                text=' '.join(self.random.choices(WORDS, k=30)),
+                cooking_time=self.random.randint(1, 180),
+                image=image,
+            )
+            for index in range(count)
+        )
+        return list(
+            Recipe.objects.order_by('-id').values_list(
+                'id', flat=True,
+            )[:count]
+        )
+
+    def create_image(self):
+        """Method saves a single image shared by all generated recipes."""
+
+        content = io.BytesIO()
+        Image.new('RGB', (640, 480), '#E26C2D').save(content, 'JPEG')
+        return Recipe._meta.get_field('image').storage.save(
+            'images/fake.jpg',
+            ContentFile(content.getvalue()),
+        )
@@ -1,26 +1,228 @@
 import csv
+import gzip
+import io
+import json
+import os
+import time
 
+from app.cache import ingredient_cache
+from app.management.utils import batched
 from app.models import Ingredient
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 
 from foodgram_backend.settings import LOAD_DATA_DIR
 
+PROGRESS_EVERY = 50000
+
+
+def read_csv(file):
+    """Generator yielding ingredients from a csv file."""
+
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0].strip(), row[1].strip()
+
+
+def read_json(file, chunk_size=65536):
+    """
+    Generator yielding ingredients from a json array or from
+    newline-delimited json, without loading the whole file.
+    """
+
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if buffer:
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise CommandError('Malformed json input')
+            else:
+                buffer = buffer[end:]
+                yield obj['name'].strip(), obj['measurement_unit'].strip()
+                continue
+        if eof:
+            return
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+class CSVStream(io.RawIOBase):
+    """Read-only file object encoding the rows to csv on the fly."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while len(self.buffer) < len(target):
+            row = next(self.rows, None)
+            if row is None:
+                break
+            line = io.StringIO()
+            csv.writer(line).writerow(row)
+            self.buffer += line.getvalue().encode()
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
 
 class Command(BaseCommand):
-    """Command to upload ingredients to the database from a csv file."""
+    """
+    Command to upload ingredients to the database from a csv
+    or json file, optionally gzipped. Ingredients that already
+    exist are skipped, so the command can be run repeatedly.
+    """
+
+    help = 'Uploads ingredients from a csv or json file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join(LOAD_DATA_DIR, 'ingredients.csv'),
+            help='path to a .csv, .json or .ndjson file, optionally .gz',
+        )
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'json'),
+            help='input format, detected by the file extension by default',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='number of ingredients written per query',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='only report which ingredients would be added',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='do not use COPY even when running on PostgreSQL',
+        )
 
     def handle(self, *args, **options):
-        with open(
-                f'{LOAD_DATA_DIR}/ingredients.csv',
-                encoding='utf-8',
-        ) as csvfile:
-            reader = csv.reader(csvfile)
-            temp_data = [Ingredient(
-                name=row[0],
-                measurement_unit=row[1],
-            ) for row in reader]
-            Ingredient.objects.bulk_create(temp_data)
-            self.stdout.write(self.style.SUCCESS(
-                'Ingredients have been uploaded to the database')
+        path = options['path']
+        input_format = options['format'] or self.detect_format(path)
+        opener = gzip.open if path.endswith('.gz') else open
+        self.verbosity = options['verbosity']
+        self.started = time.monotonic()
+        self.processed = 0
+        with opener(path, 'rt', encoding='utf-8') as file:
+            reader = read_json if input_format == 'json' else read_csv
+            rows = self.track_progress(reader(file))
+            if options['dry_run']:
+                self.diff(rows, options['batch_size'])
+                return
+            before = Ingredient.objects.count()
+            if self.can_copy() and not options['no_copy']:
+                self.copy(rows)
+            else:
+                self.bulk_insert(rows, options['batch_size'])
+        ingredient_cache.invalidate()
+        added = Ingredient.objects.count() - before
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Ingredients have been uploaded to the database: '
+            f'{added} added, {self.processed - added} skipped '
+            f'in {elapsed:.2f}s')
+        )
+
+    def detect_format(self, path):
+        name = path[:-3] if path.endswith('.gz') else path
+        if name.endswith(('.json', '.ndjson')):
+            return 'json'
+        return 'csv'
+
+    def can_copy(self):
+        return connection.vendor == 'postgresql'
+
+    def track_progress(self, rows):
+        """Generator counting the rows and reporting the throughput."""
+
+        for row in rows:
+            self.processed += 1
+            if self.processed % PROGRESS_EVERY == 0:
+                elapsed = time.monotonic() - self.started
+                self.stdout.write(
+                    f'{self.processed} rows processed, '
+                    f'{self.processed / elapsed:.0f} rows/s'
+                )
+            yield row
+
+    def bulk_insert(self, rows, batch_size):
+        """Method inserts the ingredients in batches, skipping existing."""
+
+        for batch in batched(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                ),
+                ignore_conflicts=True,
+            )
+
+    def copy(self, rows):
+        """
+        Method streams the ingredients into a temporary table with COPY
+        and moves them to the ingredient table, skipping existing.
+        """
+
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_import '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY ingredient_import FROM STDIN WITH (FORMAT csv)',
+                CSVStream(rows),
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_import '
+                'ON CONFLICT DO NOTHING'
+            )
+
+    def diff(self, rows, batch_size):
+        """Method reports the ingredients that would be added."""
+
+        seen = set()
+        added = existing = duplicates = 0
+        for batch in batched(rows, batch_size):
+            present = set(
+                Ingredient.objects.filter(
+                    name__in={name for name, _ in batch},
+                ).values_list('name', 'measurement_unit')
             )
+            for row in batch:
+                if row in seen:
+                    duplicates += 1
+                    continue
+                seen.add(row)
+                if row in present:
+                    existing += 1
+                    continue
+                added += 1
+                if self.verbosity > 1:
+                    self.stdout.write(f'+ {row[0]} ({row[1]})')
+        self.stdout.write(self.style.SUCCESS(
+            f'Dry run: {added} would be added, {existing} already exist, '
+            f'{duplicates} duplicates in the input')
+        )
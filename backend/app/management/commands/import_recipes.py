@@ -0,0 +1,192 @@
+import json
+import multiprocessing
+import os
+import time
+
+from app.counters import recount_counters
+from app.management.commands.export_recipes import RECIPES_FILE
+from app.management.utils import batched
+from app.models import (
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    Tag,
+    TagForRecipe,
+)
+from app.search import update_ingredient_ids, update_search_vectors
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management import BaseCommand, CommandError
+from django.db import connections, transaction
+
+User = get_user_model()
+
+
+class RecipeImporter:
+    """
+    Imports recipes from an ndjson file in batches. Authors, tags and
+    ingredients are resolved through name to id maps built once per run.
+    bulk_create sends no signals, so the search vectors and ingredient
+    ids of every batch are computed in its transaction.
+    """
+
+    def __init__(self, directory, batch_size, with_images):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.with_images = with_images
+        self.storage = Recipe._meta.get_field('image').storage
+        self.authors = dict(User.objects.values_list('email', 'id'))
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.ingredients = {
+            (name, measurement_unit): pk
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit',
+            )
+        }
+        self.imported = 0
+        self.skipped = 0
+
+    def read(self, shard=0, shards=1):
+        """Generator yielding the records of the given shard."""
+
+        with open(
+                os.path.join(self.directory, RECIPES_FILE),
+                encoding='utf-8',
+        ) as file:
+            for index, line in enumerate(file):
+                if index % shards == shard and line.strip():
+                    yield json.loads(line)
+
+    def run(self, shard=0, shards=1):
+        for batch in batched(self.read(shard, shards), self.batch_size):
+            self.import_batch(batch)
+        return self.imported, self.skipped
+
+    def resolve(self, record):
+        """
+        Method returns the recipe with its tag and ingredient ids,
+        or None when something referenced by the record is missing.
+        """
+
+        try:
+            author_id = self.authors[record['author']]
+            tag_ids = {self.tags[slug] for slug in record['tags']}
+            amounts = {
+                self.ingredients[
+                    (obj['name'], obj['measurement_unit'])
+                ]: obj['amount']
+                for obj in record['ingredients']
+            }
+        except KeyError:
+            return None
+        recipe = Recipe(
+            author_id=author_id,
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+        )
+        recipe.image.name = self.save_image(record['image'])
+        return recipe, tag_ids, amounts
+
+    def save_image(self, name):
+        if not self.with_images or not name:
+            return name
+        with open(os.path.join(self.directory, name), 'rb') as file:
+            return self.storage.save(name, File(file))
+
+    def import_batch(self, batch):
+        resolved = [self.resolve(record) for record in batch]
+        resolved = [obj for obj in resolved if obj is not None]
+        self.skipped += len(batch) - len(resolved)
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create(
+                [recipe for recipe, _, _ in resolved],
+            )
+            IngredientInRecipe.objects.bulk_create(
+                IngredientInRecipe(
+                    recipe_id=recipe.pk,
+                    ingredient_id=ingredient_id,
+                    amount=amount,
+                )
+                for recipe, (_, _, amounts) in zip(recipes, resolved)
+                for ingredient_id, amount in amounts.items()
+            )
+            TagForRecipe.objects.bulk_create(
+                TagForRecipe(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe, (_, tag_ids, _) in zip(recipes, resolved)
+                for tag_id in tag_ids
+            )
+            recipe_ids = [recipe.pk for recipe in recipes]
+            update_search_vectors(apps, recipe_ids)
+            update_ingredient_ids(apps, recipe_ids)
+        self.imported += len(recipes)
+
+
+def import_shard(directory, batch_size, with_images, shard, shards):
+    """Function imports one shard of the input in a worker process."""
+
+    try:
+        importer = RecipeImporter(directory, batch_size, with_images)
+        return importer.run(shard, shards)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """
+    Command to import recipes exported by export_recipes.
+    Records referencing unknown authors, tags or ingredients are skipped.
+    """
+
+    help = 'Imports recipes from an ndjson export with image side files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='directory of the export')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='number of recipes written per transaction',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='number of processes, each importing its own shard',
+        )
+        parser.add_argument(
+            '--no-images',
+            action='store_true',
+            help='keep the image names without copying the files',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.exists(os.path.join(directory, RECIPES_FILE)):
+            raise CommandError(f'{RECIPES_FILE} not found in {directory}')
+        arguments = (
+            directory,
+            options['batch_size'],
+            not options['no_images'],
+        )
+        workers = options['workers']
+        started = time.monotonic()
+        if workers > 1:
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                results = pool.starmap(
+                    import_shard,
+                    [arguments + (shard, workers) for shard in range(workers)],
+                )
+        else:
+            results = [RecipeImporter(*arguments).run()]
+        imported = sum(result[0] for result in results)
+        skipped = sum(result[1] for result in results)
+        recount_counters(apps)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{imported} recipes have been imported, {skipped} skipped '
+            f'in {elapsed:.2f}s')
+        )
@@ -0,0 +1,21 @@
+from app.counters import recount_counters
+
+from django.apps import apps
+from django.core.management import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    """
+    Command to reconcile the denormalized counters
+    of recipes and users with the actual number of objects.
+    """
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recount_counters(apps)
+        for counter, rows in fixed.items():
+            self.stdout.write(f'{counter}: {rows} rows fixed')
+        self.stdout.write(self.style.SUCCESS(
+            'Counters have been reconciled')
+        )
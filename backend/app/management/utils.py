@@ -0,0 +1,12 @@
+from itertools import islice
+
+
+def batched(iterable, size):
+    """Generator splitting the iterable into lists of the given size."""
+
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,79 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+# Multiprocess mode is enabled by gunicorn.conf.py for the server only.
+# The directory may be missing in a process started with the variable
+# inherited, the value files of the metrics below are created in it.
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Request latency by view action.',
+    ('view', 'method', 'status'),
+    buckets=(
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+    ),
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_queries',
+    'Number of database queries per request by view action.',
+    ('view',),
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64, 128),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'foodgram_requests_in_progress',
+    'Requests being handled by all workers.',
+    multiprocess_mode='livesum',
+)
+WORKERS = Gauge(
+    'foodgram_workers',
+    'Live worker processes, set by the post_fork hook of gunicorn.',
+    multiprocess_mode='livesum',
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Reference cache lookups by tier and result.',
+    ('cache', 'result'),
+)
+EVENTS = Counter(
+    'foodgram_events',
+    'Business events.',
+    ('event',),
+)
+
+
+def record_event(event, amount=1):
+    """Function increments the business counter of the event."""
+
+    EVENTS.labels(event).inc(amount)
+
+
+def get_registry():
+    """
+    Function returns the registry to expose. When running under
+    gunicorn with PROMETHEUS_MULTIPROC_DIR set, the metrics of all
+    workers are aggregated from the files in that directory.
+    """
+
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def export():
+    """Function returns the metrics in the text exposition format."""
+
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
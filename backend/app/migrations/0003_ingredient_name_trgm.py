@@ -0,0 +1,21 @@
+# Generated by Django 4.2.3 on 2026-10-17 05:48
+
+import app.operations
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        app.operations.AddPostgreSQLIndex(
+            model_name='ingredient',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='ingredient_name_trgm', opclasses=('gin_trgm_ops',)),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.3 on 2026-10-17 05:53
+
+from app.counters import recount_counters
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    recount_counters(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_recipe_name_id_idx'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='number of additions to shopping carts'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favourites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='number of additions to favorites'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.3 on 2026-10-17 06:27
+
+import app.operations
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_search_vectors(apps, schema_editor):
+    """
+    Computes the search vectors of the existing recipes on PostgreSQL,
+    weighting the name A, the ingredient names B and the text C.
+    """
+
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    config = settings.RECIPE_SEARCH_CONFIG
+    ingredients = Subquery(
+        apps.get_model('app', 'IngredientInRecipe').objects.filter(
+            recipe=OuterRef('pk'),
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' '),
+        ).values('names'),
+    )
+    apps.get_model('app', 'Recipe').objects.using(
+        schema_editor.connection.alias,
+    ).update(
+        search_vector=(
+            django.contrib.postgres.search.SearchVector(
+                'name', weight='A', config=config,
+            )
+            + django.contrib.postgres.search.SearchVector(
+                ingredients, weight='B', config=config,
+            )
+            + django.contrib.postgres.search.SearchVector(
+                'text', weight='C', config=config,
+            )
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='search vector'),
+        ),
+        app.operations.AddPostgreSQLIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+        migrations.RunPython(
+            populate_search_vectors,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.3 on 2026-10-17 06:31
+
+import app.fields
+import app.operations
+import django.contrib.postgres.indexes
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_ingredient_ids(apps, schema_editor):
+    """Fills the sorted ingredient ids of the existing recipes on PostgreSQL."""
+
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    apps.get_model('app', 'Recipe').objects.using(
+        schema_editor.connection.alias,
+    ).update(
+        ingredient_ids=Subquery(
+            apps.get_model('app', 'IngredientInRecipe').objects.filter(
+                recipe=OuterRef('pk'),
+            ).order_by().values('recipe').annotate(
+                ids=ArrayAgg('ingredient_id', ordering='ingredient_id'),
+            ).values('ids'),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=app.fields.PostgreSQLArrayField(base_field=models.BigIntegerField(), editable=False, null=True, size=None, verbose_name='sorted ids of the ingredients'),
+        ),
+        app.operations.AddPostgreSQLIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ingredient_ids'], name='recipe_ingredient_ids_idx'),
+        ),
+        migrations.RunPython(
+            populate_ingredient_ids,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -1,6 +1,9 @@
+from app.fields import PostgreSQLArrayField
 from app.validators import validate_HEX_format
 
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
@@ -69,6 +72,13 @@ class Ingredient(models.Model):
                 name='unique_ingredient',
             ),
         )
+        indexes = (
+            GinIndex(
+                fields=('name',),
+                name='ingredient_name_trgm',
+                opclasses=('gin_trgm_ops',),
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -91,6 +101,11 @@ class Recipe(models.Model):
         upload_to='images/',
         verbose_name=_('image'),
     )
+    image_variants = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name=_('image variants'),
+    )
     text = models.TextField(verbose_name=_('recipe description'))
     ingredients = models.ManyToManyField(
         to=Ingredient,
@@ -113,11 +128,52 @@ class Recipe(models.Model):
             ),
         ),
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name=_('date of change'),
+    )
+    favourites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('number of additions to favorites'),
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('number of additions to shopping carts'),
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name=_('search vector'),
+    )
+    ingredient_ids = PostgreSQLArrayField(
+        base_field=models.BigIntegerField(),
+        null=True,
+        editable=False,
+        verbose_name=_('sorted ids of the ingredients'),
+    )
 
     class Meta:
         verbose_name = _('recipe')
         verbose_name_plural = _('recipes')
         ordering = ('name',)
+        indexes = (
+            models.Index(fields=('name', 'id'), name='recipe_name_id_idx'),
+            models.Index(
+                fields=('author', 'name', 'id'),
+                name='recipe_author_name_id_idx',
+            ),
+            GinIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx',
+            ),
+            GinIndex(
+                fields=('ingredient_ids',),
+                name='recipe_ingredient_ids_idx',
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -189,6 +245,12 @@ class TagForRecipe(models.Model):
                 name='unique_tag_in_recipe',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('tag', 'recipe'),
+                name='tagforrecipe_tag_recipe_idx',
+            ),
+        )
 
     def __str__(self):
         return f'{self.recipe} - {self.tag}'
@@ -220,6 +282,12 @@ class Follow(models.Model):
                 name='unique_follow',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('following', 'user'),
+                name='follow_following_user_idx',
+            ),
+        )
 
     def __str__(self):
         return f'{self.user} subscriber of the {self.following}'
@@ -251,6 +319,12 @@ class Favourite(models.Model):
                 name='unique_favourite',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('recipe', 'user'),
+                name='favourite_recipe_user_idx',
+            ),
+        )
 
     def __str__(self):
         return f'{self.user} favorite {self.recipe}'
@@ -282,6 +356,12 @@ class ShoppingCart(models.Model):
                 name='unique_shopping_cart',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('recipe', 'user'),
+                name='shoppingcart_recipe_user_idx',
+            ),
+        )
 
     def __str__(self):
         return f'{self.user} added {self.recipe} to the cart'
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+class AddPostgreSQLIndex(migrations.AddIndex):
+    """
+    Adds an index that relies on PostgreSQL-only features.
+    The index is kept in the migration state on every database,
+    but is created only on PostgreSQL, so SQLite can still be migrated.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state,
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state,
+            )
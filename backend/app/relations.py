@@ -0,0 +1,108 @@
+from app.counters import COUNTERS
+
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+def get_relation(model):
+    """
+    Function returns the foreign key of the relation model to its target
+    and the name of the target counter that counts the relations.
+    """
+
+    for _, field, counted_label, foreign_key in COUNTERS:
+        if model._meta.label == counted_label:
+            return model._meta.get_field(foreign_key), field
+    raise ValueError(f'{model._meta.label} is not a counted relation')
+
+
+def get_change_sql(connection, model, foreign_key, user_id, pks, delta):
+    """
+    Function returns the statement inserting or deleting the relations
+    of the user to the targets, returning the ids of the changed targets.
+    Inserting selects from the target table, so missing targets and
+    existing relations are skipped instead of raising an IntegrityError.
+    """
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    user = quote(model._meta.get_field('user').column)
+    column = quote(foreign_key.column)
+    placeholders = ', '.join(['%s'] * len(pks))
+    if delta < 0:
+        return (
+            f'DELETE FROM {table} '
+            f'WHERE {user} = %s AND {column} IN ({placeholders}) '
+            f'RETURNING {column}'
+        ), [user_id, *pks]
+    target = foreign_key.related_model._meta
+    target_pk = quote(target.pk.column)
+    return (
+        f'INSERT INTO {table} ({user}, {column}) '
+        f'SELECT %s, {target_pk} FROM {quote(target.db_table)} '
+        f'WHERE {target_pk} IN ({placeholders}) '
+        f'ON CONFLICT DO NOTHING RETURNING {column}'
+    ), [user_id, *pks]
+
+
+def change_relations(model, user, pks, delta):
+    """
+    Function adds (delta 1) or removes (delta -1) the relations of the user
+    to the targets with the given pks and changes their counters.
+    Returns the targets whose relation has changed. On PostgreSQL this
+    is a single statement, the counters are updated in a data-modifying
+    CTE. Other databases run the statement and the counter update
+    in a transaction. The counted signals are not sent.
+    """
+
+    pks = sorted(set(pks))
+    if not pks:
+        return []
+    foreign_key, counter = get_relation(model)
+    target = foreign_key.related_model
+    using = router.db_for_write(model)
+    connection = connections[using]
+    sql, params = get_change_sql(
+        connection, model, foreign_key, user.pk, pks, delta,
+    )
+    if connection.vendor != 'postgresql':
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                changed = [row[0] for row in cursor.fetchall()]
+            queryset = target._default_manager.using(using).filter(
+                pk__in=changed,
+            )
+            queryset.update(**{counter: Greatest(F(counter) + delta, 0)})
+            return list(queryset)
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(field.column) for field in target._meta.concrete_fields
+    )
+    counter = quote(target._meta.get_field(counter).column)
+    sql = (
+        f'WITH changed AS ({sql}), counted AS ('
+        f'UPDATE {quote(target._meta.db_table)} '
+        f'SET {counter} = GREATEST({counter} + %s, 0) '
+        f'WHERE {quote(target._meta.pk.column)} IN '
+        f'(SELECT {quote(foreign_key.column)} FROM changed) '
+        f'RETURNING {columns}) '
+        f'SELECT {columns} FROM counted'
+    )
+    return list(target._default_manager.db_manager(using).raw(
+        sql,
+        [*params, delta],
+    ))
+
+
+def add_relations(model, user, pks):
+    """Function adds the relations, returns the targets added."""
+
+    return change_relations(model, user, pks, 1)
+
+
+def remove_relations(model, user, pks):
+    """Function removes the relations, returns the targets removed."""
+
+    return change_relations(model, user, pks, -1)
@@ -0,0 +1,271 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from app.models import IngredientInRecipe
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg, StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections, router
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    IntegerField,
+    Max,
+    OuterRef,
+    Subquery,
+    When,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+WORD_RE = re.compile(r'\w+')
+
+# Weights of the name, ingredients and text of a recipe,
+# the same as the PostgreSQL defaults for the A, B and C labels.
+WEIGHTS = (('name', 1.0), ('ingredients', 0.4), ('text', 0.2))
+
+
+def update_search_vectors(apps, recipe_ids=None):
+    """
+    Function recomputes the search vectors of the recipes with the given
+    ids, an iterable or a queryset of ids, or of all recipes. The name
+    is weighted A, the ingredient names B and the text C. Does nothing
+    on databases other than PostgreSQL, which search with RecipeIndex.
+    """
+
+    recipe_model = apps.get_model('app', 'Recipe')
+    using = router.db_for_write(recipe_model)
+    if connections[using].vendor != 'postgresql':
+        return 0
+    config = settings.RECIPE_SEARCH_CONFIG
+    ingredients = Subquery(
+        apps.get_model('app', 'IngredientInRecipe').objects.filter(
+            recipe=OuterRef('pk'),
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' '),
+        ).values('names'),
+    )
+    queryset = recipe_model.objects.using(using)
+    if recipe_ids is not None:
+        queryset = queryset.filter(pk__in=recipe_ids)
+    return queryset.update(
+        search_vector=(
+            SearchVector('name', weight='A', config=config)
+            + SearchVector(ingredients, weight='B', config=config)
+            + SearchVector('text', weight='C', config=config)
+        ),
+    )
+
+
+def update_ingredient_ids(apps, recipe_ids=None):
+    """
+    Function recomputes the sorted ingredient ids of the recipes with
+    the given ids, an iterable or a queryset of ids, or of all recipes.
+    Does nothing on databases other than PostgreSQL, where
+    search_by_ingredients reads IngredientInRecipe instead.
+    """
+
+    recipe_model = apps.get_model('app', 'Recipe')
+    using = router.db_for_write(recipe_model)
+    if connections[using].vendor != 'postgresql':
+        return 0
+    queryset = recipe_model.objects.using(using)
+    if recipe_ids is not None:
+        queryset = queryset.filter(pk__in=recipe_ids)
+    return queryset.update(
+        ingredient_ids=Subquery(
+            apps.get_model('app', 'IngredientInRecipe').objects.filter(
+                recipe=OuterRef('pk'),
+            ).order_by().values('recipe').annotate(
+                ids=ArrayAgg('ingredient_id', ordering='ingredient_id'),
+            ).values('ids'),
+        ),
+    )
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower())
+
+
+class RecipeIndex:
+    """
+    In-process inverted index of the recipes, used to search
+    on databases without full-text search, e.g. SQLite in tests.
+
+    Every word of the name, the ingredient names and the text maps
+    to the recipes containing it with a weighted score. Query words
+    match the indexed words they are a prefix of, which stands in for
+    stemming, and a recipe has to match all query words. The index is
+    rebuilt when the number of recipes or their last change differs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+        self._postings = {}
+        self._words = []
+
+    def get_state(self, queryset):
+        return tuple(queryset.aggregate(
+            count=Count('id'),
+            last_modified=Max('updated_at'),
+        ).values())
+
+    def build(self, queryset):
+        postings = defaultdict(lambda: defaultdict(float))
+        recipes = queryset.prefetch_related('ingredients').only('name', 'text')
+        for recipe in recipes:
+            fields = {
+                'name': recipe.name,
+                'ingredients': ' '.join(
+                    ingredient.name for ingredient in recipe.ingredients.all()
+                ),
+                'text': recipe.text,
+            }
+            for field, weight in WEIGHTS:
+                for word in tokenize(fields[field]):
+                    postings[word][recipe.pk] += weight
+        self._postings = {
+            word: dict(scores) for word, scores in postings.items()
+        }
+        self._words = sorted(self._postings)
+
+    def refresh(self, queryset):
+        state = self.get_state(queryset)
+        with self._lock:
+            if state != self._state:
+                self.build(queryset)
+                self._state = state
+
+    def match(self, word):
+        """Method returns the scores of the recipes matching the word."""
+
+        scores = defaultdict(float)
+        index = bisect_left(self._words, word)
+        while (
+            index < len(self._words)
+            and self._words[index].startswith(word)
+        ):
+            for recipe_id, score in self._postings[
+                self._words[index]
+            ].items():
+                scores[recipe_id] += score
+            index += 1
+        return scores
+
+    def search(self, queryset, query):
+        """Method returns the ids of the matching recipes, best first."""
+
+        self.refresh(queryset.model._default_manager.using(queryset.db))
+        with self._lock:
+            ranked = None
+            for word in tokenize(query):
+                scores = self.match(word)
+                if ranked is None:
+                    ranked = scores
+                    continue
+                ranked = {
+                    recipe_id: score + scores[recipe_id]
+                    for recipe_id, score in ranked.items()
+                    if recipe_id in scores
+                }
+        return sorted(ranked or (), key=lambda pk: (-ranked[pk], pk))
+
+
+recipe_index = RecipeIndex()
+
+
+def search_recipes(queryset, query):
+    """
+    Function keeps the recipes matching the query ordered by rank.
+    On PostgreSQL the query uses the web search syntax against
+    the indexed search vector, elsewhere the in-process index.
+    """
+
+    if connections[queryset.db].vendor == 'postgresql':
+        search_query = SearchQuery(
+            query,
+            config=settings.RECIPE_SEARCH_CONFIG,
+            search_type='websearch',
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+        ).order_by('-rank', 'name', 'id')
+    recipe_ids = recipe_index.search(queryset, query)
+    if not recipe_ids:
+        return queryset.none()
+    return queryset.filter(pk__in=recipe_ids).order_by(
+        Case(
+            *(
+                When(pk=recipe_id, then=position)
+                for position, recipe_id in enumerate(recipe_ids)
+            ),
+            default=len(recipe_ids),
+        ),
+        'id',
+    )
+
+
+def search_by_ingredients(queryset, ingredient_ids, max_missing=None):
+    """
+    Function keeps the recipes using any of the given ingredients,
+    annotated with the number of their other, missing ingredients,
+    and orders them by that number and then by cooking time.
+    On PostgreSQL the candidates are found through the GIN index on
+    the ingredient_ids array, recipes missing nothing with <@ and
+    the others with &&. Elsewhere IngredientInRecipe is queried.
+    """
+
+    ingredient_ids = sorted(set(ingredient_ids))
+    if connections[queryset.db].vendor == 'postgresql':
+        quote = connections[queryset.db].ops.quote_name
+        column = (
+            f'{quote(queryset.model._meta.db_table)}.'
+            f'{quote("ingredient_ids")}'
+        )
+        if max_missing == 0:
+            queryset = queryset.filter(
+                ingredient_ids__contained_by=ingredient_ids,
+            )
+        else:
+            queryset = queryset.filter(ingredient_ids__overlap=ingredient_ids)
+        queryset = queryset.annotate(
+            missing_ingredients=RawSQL(
+                f'cardinality({column}) - (SELECT count(*) '
+                f'FROM unnest({column}) AS ingredient '
+                f'WHERE ingredient = ANY(%s))',
+                (ingredient_ids,),
+                output_field=IntegerField(),
+            ),
+        )
+    else:
+        ingredients = IngredientInRecipe.objects.filter(
+            recipe=OuterRef('pk'),
+        )
+        queryset = queryset.filter(
+            Exists(ingredients.filter(ingredient_id__in=ingredient_ids)),
+        ).annotate(
+            missing_ingredients=Coalesce(
+                Subquery(
+                    ingredients.exclude(
+                        ingredient_id__in=ingredient_ids,
+                    ).order_by().values('recipe').annotate(
+                        count=Count('id'),
+                    ).values('count'),
+                    output_field=IntegerField(),
+                ),
+                0,
+            ),
+        )
+    if max_missing is not None:
+        queryset = queryset.filter(missing_ingredients__lte=max_missing)
+    return queryset.order_by('missing_ingredients', 'cooking_time', 'id')
@@ -0,0 +1,167 @@
+from app.cache import ingredient_cache, recipe_state_cache, tag_cache
+from app.counters import change_counters
+from app.images import schedule_variants
+from app.models import (
+    Favourite,
+    Follow,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+    TagForRecipe,
+)
+from app.search import update_ingredient_ids, update_search_vectors
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+AUTHOR_FIELDS = frozenset(('email', 'username', 'first_name', 'last_name'))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_cache(sender, instance, **kwargs):
+    """
+    Marks the recipes with the tag as changed when a tag is changed
+    and invalidates the cached tags once the change is committed,
+    so the old tags are never cached under the new version.
+    """
+
+    transaction.on_commit(tag_cache.invalidate)
+    Recipe.objects.filter(
+        tag_in_recipes__tag_id=instance.pk,
+    ).update(updated_at=timezone.now())
+
+
+def get_ingredient_recipe_ids(ingredient):
+    return list(Recipe.objects.filter(
+        ingredient_in_recipes__ingredient_id=ingredient.pk,
+    ).values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def collect_ingredient_recipes(sender, instance, **kwargs):
+    """
+    Remembers the recipes using the ingredient before it is deleted,
+    their links to it are deleted by the cascade before post_delete.
+    """
+
+    instance.recipe_ids = get_ingredient_recipe_ids(instance)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_cache(sender, instance, **kwargs):
+    """
+    Marks the recipes with the ingredient as changed, and once the
+    transaction is committed invalidates the cached ingredients and
+    recomputes the search vectors and ingredient ids of the recipes.
+    """
+
+    transaction.on_commit(ingredient_cache.invalidate)
+    recipe_ids = getattr(instance, 'recipe_ids', None)
+    if recipe_ids is None:
+        recipe_ids = get_ingredient_recipe_ids(instance)
+    if not recipe_ids:
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+
+    def update():
+        update_search_vectors(apps, recipe_ids)
+        update_ingredient_ids(apps, recipe_ids)
+
+    transaction.on_commit(update)
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+@receiver((post_save, post_delete), sender=TagForRecipe)
+def touch_recipe(sender, instance, **kwargs):
+    """Marks the recipe as changed when its ingredients or tags change."""
+
+    Recipe.objects.filter(
+        pk=instance.recipe_id,
+    ).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def touch_author_recipes(sender, instance, created, update_fields, **kwargs):
+    """
+    Marks the recipes of the user as changed when the user is saved,
+    since the recipes are served together with their author.
+    Saves of fields not shown with the author, like last_login,
+    are skipped.
+    """
+
+    if created or (
+        update_fields is not None and AUTHOR_FIELDS.isdisjoint(update_fields)
+    ):
+        return
+    Recipe.objects.filter(
+        author_id=instance.pk,
+    ).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_save, sender=Recipe)
+def increase_counters(sender, instance, created, **kwargs):
+    """Increases the counters when a counted object is created."""
+
+    if created:
+        change_counters(apps, instance, 1)
+
+
+@receiver(post_delete, sender=Favourite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Follow)
+@receiver(post_delete, sender=Recipe)
+def decrease_counters(sender, instance, **kwargs):
+    """Decreases the counters when a counted object is deleted."""
+
+    change_counters(apps, instance, -1)
+
+
+@receiver((post_save, post_delete), sender=Favourite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Follow)
+def invalidate_recipe_state(sender, instance, **kwargs):
+    """
+    Drops the cached recipe state of the user once the transaction that
+    has changed the favorites, shopping cart or subscriptions is committed.
+    """
+
+    transaction.on_commit(
+        lambda: recipe_state_cache.invalidate(instance.user_id),
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_search_update(sender, instance, **kwargs):
+    """
+    Recomputes the search vector and the ingredient ids of the recipe
+    once the transaction that has saved it, together with its
+    ingredients, is committed.
+    """
+
+    def update():
+        update_search_vectors(apps, [instance.pk])
+        update_ingredient_ids(apps, [instance.pk])
+
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_recipe_image_variants(sender, instance, **kwargs):
+    """
+    Schedules building of the image variants once the transaction
+    that has changed the recipe image is committed.
+    """
+
+    if instance.image and (
+        instance.image_variants.get('source') != instance.image.name
+    ):
+        transaction.on_commit(lambda: schedule_variants(instance.pk))
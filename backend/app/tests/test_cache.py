@@ -0,0 +1,89 @@
+from app.cache import UserRecipeState, recipe_state_cache, tag_cache
+from app.models import Favourite, Recipe, Tag
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+User = get_user_model()
+
+
+class RecipeStateCacheTest(TestCase):
+    """Cached recipe states never outlive a committed change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com',
+            username='user',
+            first_name='user',
+            last_name='user',
+            password='password',
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user,
+            name='recipe',
+            text='text',
+            image='recipes/images/recipe.png',
+            cooking_time=1,
+        )
+
+    def setUp(self):
+        recipe_state_cache.backend.clear()
+
+    def test_change_is_seen_after_commit(self):
+        self.assertFalse(
+            recipe_state_cache.get(self.user.pk).is_favorited(self.recipe.pk),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Favourite.objects.create(user=self.user, recipe=self.recipe)
+        self.assertTrue(
+            recipe_state_cache.get(self.user.pk).is_favorited(self.recipe.pk),
+        )
+
+    def test_state_loaded_before_a_change_is_not_served(self):
+        version = recipe_state_cache.get_version(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favourite.objects.create(user=self.user, recipe=self.recipe)
+        recipe_state_cache.backend.set(
+            recipe_state_cache.make_key(self.user.pk, version),
+            UserRecipeState(),
+        )
+        self.assertTrue(
+            recipe_state_cache.get(self.user.pk).is_favorited(self.recipe.pk),
+        )
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'reference-cache-test',
+}})
+class ReferenceCacheTest(TestCase):
+    """Cached tags are served until a tag change is committed."""
+
+    url = '/api/tags/'
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='breakfast', color='#FFFFFF', slug='breakfast')
+
+    def setUp(self):
+        tag_cache.backend.clear()
+
+    def get(self, etag=None):
+        headers = {} if etag is None else {'If-None-Match': etag}
+        return self.client.get(self.url, headers=headers)
+
+    def test_tag_change_is_served_after_commit(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(etag).status_code, 304)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Tag.objects.create(name='dinner', color='#000000', slug='dinner')
+        self.assertEqual(self.get(etag).status_code, 304)
+        for callback in callbacks:
+            callback()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [tag['slug'] for tag in response.json()],
+            ['breakfast', 'dinner'],
+        )
@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from app.models import Favourite, IngredientInRecipe, Recipe, ShoppingCart
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+User = get_user_model()
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
+class LoadTestingCommandsTest(TestCase):
+    """The synthetic data can be generated and benchmarked."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        media_root = override_settings(MEDIA_ROOT=self.temp_dir)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def call(self, name, *args):
+        out = StringIO()
+        call_command(name, *args, stdout=out)
+        return out.getvalue()
+
+    def test_generate_fake_data(self):
+        out = self.call(
+            'generate_fake_data',
+            '--users', '5',
+            '--recipes', '12',
+            '--ingredients-per-recipe', '3',
+            '--favourites-per-user', '2',
+            '--carts-per-user', '2',
+            '--follows-per-user', '2',
+            '--batch-size', '4',
+        )
+        self.assertIn('5 users and 12 recipes have been generated', out)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Recipe.objects.count(), 12)
+        self.assertEqual(IngredientInRecipe.objects.count(), 36)
+        self.assertEqual(Favourite.objects.count(), 10)
+        self.assertEqual(ShoppingCart.objects.count(), 10)
+        recipe = Recipe.objects.order_by('-favourites_count').first()
+        self.assertEqual(
+            recipe.favourites_count,
+            Favourite.objects.filter(recipe=recipe).count(),
+        )
+
+    def test_benchmark_api(self):
+        self.call('generate_fake_data', '--users', '3', '--recipes', '6')
+        results_file = os.path.join(self.temp_dir, 'results.json')
+        for scenario in ('recipes.list', 'download_shopping_cart?format'):
+            with self.subTest(scenario=scenario):
+                self.call(
+                    'benchmark_api',
+                    '--repeat', '2',
+                    '--warmup', '0',
+                    '--filter', scenario,
+                    '--json', results_file,
+                )
+                with open(results_file, encoding='utf-8') as file:
+                    results = json.load(file)
+                self.assertTrue(results)
+                for result in results:
+                    self.assertIn(scenario, result['name'])
+                    self.assertEqual(result['status'], 200)
+                    self.assertGreater(result['queries'], 0)
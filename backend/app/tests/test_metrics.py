@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+WORKER_SCRIPT = textwrap.dedent('''
+    import os
+    import runpy
+
+    config = runpy.run_path('gunicorn.conf.py')
+    config['on_starting'](None)
+
+    from app.metrics import EVENTS, export
+
+    pid = os.fork()
+    if not pid:
+        config['post_fork'](None, None)
+        EVENTS.labels('worker_event').inc()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    print(export()[0].decode())
+''')
+
+EXPORT_SCRIPT = textwrap.dedent('''
+    from app.metrics import export
+
+    print(export()[0].decode())
+''')
+
+
+class MultiprocessMetricsTest(SimpleTestCase):
+    """Metrics of forked gunicorn workers reach the export."""
+
+    def run_script(self, script, metrics_dir=None):
+        environ = {
+            key: value for key, value in os.environ.items()
+            if key != 'PROMETHEUS_MULTIPROC_DIR'
+        }
+        if metrics_dir is not None:
+            environ['PROMETHEUS_MULTIPROC_DIR'] = metrics_dir
+        return subprocess.run(
+            (sys.executable, '-c', script),
+            cwd=settings.BASE_DIR,
+            env=environ,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    def test_worker_metrics_are_exported(self):
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            result = self.run_script(WORKER_SCRIPT, metrics_dir)
+        self.assertIn(
+            'foodgram_events_total{event="worker_event"} 1.0',
+            result.stdout,
+        )
+        self.assertIn('foodgram_workers 1.0', result.stdout)
+
+    def test_other_processes_are_not_workers(self):
+        result = self.run_script(EXPORT_SCRIPT)
+        self.assertIn('foodgram_workers 0.0', result.stdout)
+
+    def test_missing_directory_is_created(self):
+        with tempfile.TemporaryDirectory() as parent:
+            metrics_dir = os.path.join(parent, 'prometheus')
+            self.run_script(EXPORT_SCRIPT, metrics_dir)
+            self.assertTrue(os.path.isdir(metrics_dir))
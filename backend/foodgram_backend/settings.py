@@ -16,6 +16,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -28,6 +29,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,10 +67,28 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=0)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', default='true').lower() == 'true',
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_PGBOUNCER', default='false').lower() == 'true',
     }
 }
 
+for index, address in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(','))):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.database.ReplicaRouter']
+
+REPLICA_PIN_CACHE_ALIAS = 'default'
+REPLICA_PIN_TIMEOUT = int(os.getenv('REPLICA_PIN_TIMEOUT', default=5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -97,12 +118,79 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', default=2))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+REFERENCE_CACHE_ALIAS = 'default'
+REFERENCE_CACHE_TIMEOUT = int(os.getenv('REFERENCE_CACHE_TIMEOUT', default=86400))
+REFERENCE_CACHE_LOCAL_SIZE = int(os.getenv('REFERENCE_CACHE_LOCAL_SIZE', default=256))
+
+RECIPE_SEARCH_CONFIG = os.getenv('RECIPE_SEARCH_CONFIG', default='russian')
+
+RECIPE_STATE_CACHE_ALIAS = 'default'
+RECIPE_STATE_CACHE_TIMEOUT = int(os.getenv('RECIPE_STATE_CACHE_TIMEOUT', default=300))
+
+TOKEN_CACHE_ALIAS = 'default'
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', default=60))
+TOKEN_CACHE_LOCAL_TIMEOUT = int(os.getenv('TOKEN_CACHE_LOCAL_TIMEOUT', default=5))
+TOKEN_CACHE_LOCAL_SIZE = int(os.getenv('TOKEN_CACHE_LOCAL_SIZE', default=1024))
+
+REQUEST_METRICS_SLOW_MS = float(os.getenv('REQUEST_METRICS_SLOW_MS', default=500))
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', default=1))
+REQUEST_METRICS_DUPLICATE_THRESHOLD = int(os.getenv('REQUEST_METRICS_DUPLICATE_THRESHOLD', default=3))
+REQUEST_METRICS_SERVER_TIMING = os.getenv('REQUEST_METRICS_SERVER_TIMING', default='true').lower() == 'true'
+# Timing serializers patches BaseSerializer.data for the whole process.
+REQUEST_METRICS_SERIALIZER_TIMING = os.getenv('REQUEST_METRICS_SERIALIZER_TIMING', default='false').lower() == 'true'
+
+# /api/metrics/ is closed until a token is set.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.metrics': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_METRICS_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.SlidingWindowThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        scope: rate for scope, rate in (
+            ('read', os.getenv('THROTTLE_READ_RATE', default='1200/min')),
+            ('write', os.getenv('THROTTLE_WRITE_RATE', default='60/min')),
+            ('toggle', os.getenv('THROTTLE_TOGGLE_RATE', default='120/min')),
+            ('recipe_write', os.getenv('THROTTLE_RECIPE_WRITE_RATE', default='30/hour')),
+            ('download', os.getenv('THROTTLE_DOWNLOAD_RATE', default='20/hour')),
+        ) if rate
+    },
+    # Requests come through nginx, which appends the client address.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -0,0 +1,33 @@
+import tempfile
+
+from foodgram_backend.settings import *  # noqa: F401, F403
+
+# Settings for running the tests without PostgreSQL:
+# DJANGO_SETTINGS_MODULE=foodgram_backend.test_settings python manage.py test
+# The PostgreSQL-only tests are skipped, run them with the default settings.
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'db.sqlite3',
+    },
+}
+# A replica alias mirroring the primary, the routing tests enable it
+# through DATABASE_REPLICAS.
+DATABASES['replica_0'] = {
+    **DATABASES['default'],
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_REPLICAS = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-media-')
+
+IMAGE_PROCESSING_WORKERS = 0
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
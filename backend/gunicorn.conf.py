@@ -0,0 +1,34 @@
+import os
+import shutil
+
+# prometheus_client picks the multiprocess value class when it is first
+# imported, so the directory has to be set before any import of it,
+# including the one in the hooks below. It is only set for the server,
+# so management commands keep the metrics in their own process.
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    '/tmp/prometheus',
+)
+
+
+def on_starting(server):
+    """Hook clearing the metrics left by the previous run."""
+
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def post_fork(server, worker):
+    """Hook counting the worker in the live workers gauge."""
+
+    from app.metrics import WORKERS
+
+    WORKERS.set(1)
+
+
+def child_exit(server, worker):
+    """Hook removing the live gauges of a finished worker."""
+
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -16,5 +16,7 @@ class CustomUser(UserAdmin):
         'first_name',
         'last_name',
         'password',
+        'recipes_count',
+        'followers_count',
     )
     list_filter = ('email', 'username')
@@ -14,6 +14,16 @@ class User(AbstractUser):
     last_name = models.CharField(_('last name'), max_length=150)
     email = models.EmailField(_('email address'), max_length=254, unique=True)
     password = models.CharField(_('password'), max_length=150)
+    recipes_count = models.PositiveIntegerField(
+        _('number of recipes'),
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        _('number of followers'),
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('id',)